@@ -0,0 +1,89 @@
+import asyncio
+import logging
+from typing import Dict, List, Optional, Set
+
+from metrics import ANNOUNCEMENTS, ERRORS
+
+logger = logging.getLogger('discord_bot')
+
+# Discord-Limit pro Nachricht
+MAX_MESSAGE_LENGTH = 2000
+
+
+def _chunk_lines(lines: List[str], limit: int = MAX_MESSAGE_LENGTH) -> List[str]:
+    """Fügt Zeilen zu möglichst wenigen Nachrichten unterhalb des Discord-Limits zusammen."""
+    chunks: List[str] = []
+    current = ''
+    for line in lines:
+        line = line[:limit]
+        if current and len(current) + 1 + len(line) > limit:
+            chunks.append(current)
+            current = line
+        else:
+            current = f'{current}\n{line}' if current else line
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+class Announcer:
+    """
+    Sammelt Meldungen der Queue-Worker pro Channel für `window` Sekunden und sendet sie
+    gebündelt als eine Nachricht. `post` blockiert nie: Senden (inkl. Warten auf Discord-Rate-Limits)
+    läuft in einer eigenen Task, nicht auf dem Switch-Pfad.
+    """
+
+    def __init__(self, window: float = 2.0):
+        self.window = window
+        self._pending: Dict[int, List[str]] = {}
+        self._channels: Dict[int, object] = {}
+        self._flush_tasks: Dict[int, asyncio.Task] = {}
+        # Starke Referenzen, bis die Task fertig ist (auch noch während des Sendens)
+        self._tasks: Set[asyncio.Task] = set()
+        # Eine Sendung pro Channel gleichzeitig, damit die Reihenfolge erhalten bleibt
+        self._send_locks: Dict[int, asyncio.Lock] = {}
+
+    def post(self, channel, text: str):
+        if channel is None:
+            return
+        self._channels[channel.id] = channel
+        self._pending.setdefault(channel.id, []).append(text)
+        ANNOUNCEMENTS.inc(kind='line')
+        if channel.id not in self._flush_tasks:
+            task = asyncio.create_task(self._flush_later(channel.id))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+            self._flush_tasks[channel.id] = task
+
+    async def _flush_later(self, channel_id: int):
+        try:
+            if self.window > 0:
+                await asyncio.sleep(self.window)
+        finally:
+            if self._flush_tasks.get(channel_id) is asyncio.current_task():
+                del self._flush_tasks[channel_id]
+        await self._send(channel_id)
+
+    async def _send(self, channel_id: int):
+        lock = self._send_locks.setdefault(channel_id, asyncio.Lock())
+        async with lock:
+            lines = self._pending.pop(channel_id, None)
+            channel = self._channels.get(channel_id)
+            if not lines or channel is None:
+                return
+            for chunk in _chunk_lines(lines):
+                try:
+                    await channel.send(chunk)
+                    ANNOUNCEMENTS.inc(kind='message')
+                except Exception as e:
+                    ERRORS.inc(component='announcer')
+                    logger.warning('Meldung an Channel %s fehlgeschlagen: %s', channel_id, e)
+
+    async def flush(self, channel_id: Optional[int] = None):
+        """Sendet ausstehende Meldungen sofort (z.B. beim Herunterfahren)."""
+        channel_ids = [channel_id] if channel_id is not None else list(self._pending)
+        for cid in channel_ids:
+            task = self._flush_tasks.pop(cid, None)
+            if task is not None:
+                task.cancel()
+            await self._send(cid)
@@ -1,47 +1,144 @@
-import requests
+import asyncio
+import json
+from typing import Iterable, Optional
+
+import aiohttp
+
+from circuit_breaker import CircuitBreaker, CircuitOpenError
+from metrics import RATE_LIMITED, RCON_REQUEST_ERRORS, RCON_REQUEST_SECONDS, RCON_REQUESTS_COALESCED
+from rate_limit import TokenBucket
+from singleflight import SingleFlight
+
+# orjson (optional) parst die großen Spielerlisten deutlich schneller als json
+try:
+    import orjson
+    _json_loads = orjson.loads
+except ImportError:
+    _json_loads = json.loads
+
+# Felder, die für die Spielersuche aus get_detailed_players benötigt werden
+PLAYER_LOOKUP_FIELDS = ("player_id", "steam_id_64", "id", "name", "team")
+
+
+def _project_players(data: dict, fields: Iterable[str]) -> dict:
+    """Reduziert result.players auf die angegebenen Felder (der Rest wird verworfen)."""
+    result = data.get("result") if isinstance(data, dict) else None
+    players = result.get("players") if isinstance(result, dict) else None
+    if not isinstance(players, dict):
+        return data
+    fields = tuple(fields)
+    slim = {
+        pid: {k: pdata[k] for k in fields if k in pdata} if isinstance(pdata, dict) else pdata
+        for pid, pdata in players.items()
+    }
+    return {**data, "result": {**result, "players": slim}}
 
 
 class APIClient:
-    def __init__(self, base_url: str, api_token: str):
+    def __init__(self, base_url: str, api_token: str, max_connections: int = 10,
+                 connect_timeout: float = 3.0, read_timeout: float = 10.0,
+                 breaker: Optional[CircuitBreaker] = None,
+                 rate_limiter: Optional[TokenBucket] = None):
         self.base_url = base_url.rstrip("/")
-        self.session = requests.Session()
-        self.session.headers.update({
+        self.headers = {
             "Authorization": f"Bearer {api_token}",
             "Connection": "keep-alive",
             "Content-Type": "application/json",
-        })
+        }
+        self.max_connections = max_connections
+        self.timeout = aiohttp.ClientTimeout(total=None, connect=connect_timeout, sock_read=read_timeout)
+        self.breaker = breaker or CircuitBreaker()
+        self.rate_limiter = rate_limiter
+        self._single_flight = SingleFlight()
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    # Session wird lazy erzeugt, da aiohttp einen laufenden Event-Loop braucht.
+    # Der Connector hält Keep-Alive-Verbindungen pro RCON im Pool.
+    def _get_session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.max_connections,
+                keepalive_timeout=60,
+                ttl_dns_cache=300,
+            )
+            self._session = aiohttp.ClientSession(headers=self.headers, connector=connector, timeout=self.timeout)
+        return self._session
+
+    async def close(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    @property
+    def is_available(self) -> bool:
+        return self.breaker.allow_request()
+
+    async def _request(self, method: str, path: str, force: bool = False, **kwargs):
+        if not force and not self.breaker.allow_request():
+            raise CircuitOpenError(f"{self.base_url}: Circuit offen, RCON wird übersprungen")
+        if self.rate_limiter is not None and not self.rate_limiter.try_acquire():
+            # Bursts an den CRCON glätten statt Requests abzulehnen
+            RATE_LIMITED.inc(scope="rcon")
+            await self.rate_limiter.acquire()
+        session = self._get_session()
+        labels = {"rcon": getattr(self, "_rcon_name", self.base_url), "endpoint": path.rsplit("/", 1)[-1]}
+        try:
+            with RCON_REQUEST_SECONDS.time(**labels):
+                async with session.request(method, f"{self.base_url}{path}", **kwargs) as resp:
+                    resp.raise_for_status()
+                    data = _json_loads(await resp.read())
+        except aiohttp.ClientResponseError as e:
+            RCON_REQUEST_ERRORS.inc(**labels)
+            # Nur Serverfehler zählen – 4xx ist ein Konfigurations-/Request-Problem
+            if e.status >= 500:
+                self.breaker.record_failure()
+            raise
+        except (aiohttp.ClientError, asyncio.TimeoutError, ValueError):
+            RCON_REQUEST_ERRORS.inc(**labels)
+            self.breaker.record_failure()
+            raise
+        self.breaker.record_success()
+        return data
+
+    async def _get(self, path: str, params: Optional[dict] = None, force: bool = False):
+        # Identische GETs, die gleichzeitig laufen, teilen sich einen Request
+        key = (path, tuple(sorted((params or {}).items())), force)
+        if self._single_flight.in_flight(key):
+            RCON_REQUESTS_COALESCED.inc(rcon=getattr(self, "_rcon_name", self.base_url),
+                                        endpoint=path.rsplit("/", 1)[-1])
+        return await self._single_flight.do(
+            key, lambda: self._request("GET", path, force=force, params=params)
+        )
+
+    async def _post(self, path: str, data: dict):
+        return await self._request("POST", path, json=data)
+
+    async def probe(self):
+        """Health-Check, der auch bei offenem Circuit ausgeführt wird."""
+        return await self._get("/api/get_gamestate", force=True)
+
+    def connect_log_stream(self, path: str = "/ws/logs"):
+        """Websocket zum CRCON-Log-Stream (als async Context Manager zu verwenden)."""
+        ws_base = "ws" + self.base_url[len("http"):] if self.base_url.startswith("http") else self.base_url
+        return self._get_session().ws_connect(f"{ws_base}{path}", heartbeat=30)
 
     # ---- NEW signature: expects player_id (Steam64 / Xbox-ID), not name
-    def switch_player_now(self, player_id: str):
-        url = f"{self.base_url}/api/switch_player_now"
+    async def switch_player_now(self, player_id: str):
         data = {"player_id": str(player_id)}
-        resp = self.session.post(url, json=data)
-        resp.raise_for_status()
-        return resp.json()
-
-    def get_player_profile(self, player_id: str, num_sessions: int = 10):
-        url = f"{self.base_url}/api/get_player_profile"
-        params = {"player_id": str(player_id), "num_sessions": int(num_sessions)}
-        resp = self.session.get(url, params=params)
-        resp.raise_for_status()
-        return resp.json()
-
-    def get_gamestate(self):
-        url = f"{self.base_url}/api/get_gamestate"
-        resp = self.session.get(url)
-        resp.raise_for_status()
-        return resp.json()
-
-    def get_detailed_players(self):
-        url = f"{self.base_url}/api/get_detailed_players"
-        resp = self.session.get(url)
-        resp.raise_for_status()
-        return resp.json()
-
-    # Optional: Mapping Name -> ID, falls du mal per Name auflösen willst
-    def get_player_ids(self, as_dict: bool = True):
-        url = f"{self.base_url}/api/get_player_ids"
+        return await self._post("/api/switch_player_now", data)
+
+    async def get_player_profile(self, player_id: str, num_sessions: int = 10):
+        params = {"player_id": str(player_id), "num_sessions": str(int(num_sessions))}
+        return await self._get("/api/get_player_profile", params)
+
+    async def get_gamestate(self):
+        return await self._get("/api/get_gamestate")
+
+    async def get_detailed_players(self, fields: Optional[Iterable[str]] = None):
+        data = await self._get("/api/get_detailed_players")
+        return _project_players(data, fields) if fields else data
+
+    # Leichtgewichtiges Mapping Name -> ID (zum Orten eines Spielers ohne vollen Roster)
+    async def get_player_ids(self, as_dict: bool = True):
         params = {"as_dict": str(as_dict).lower()}
-        resp = self.session.get(url, params=params)
-        resp.raise_for_status()
-        return resp.json()
+        return await self._get("/api/get_player_ids", params)
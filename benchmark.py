@@ -0,0 +1,233 @@
+"""
+Reproduzierbarer Benchmark/Lasttest für den Switch-Bot.
+
+Startet lokale Fake-CRCON-Server (siehe fake_crcon.py), treibt handle_command mit
+synthetischen Discord-Nachrichten und arbeitet anschließend die Switch-Queues ab.
+Es wird keine Verbindung zu Discord oder zu produktiven CRCONs aufgebaut.
+
+Beispiel:
+    python benchmark.py --servers 3 --players 100 --latency-ms 20 --commands 300
+"""
+import argparse
+import asyncio
+import logging
+import os
+import random
+import tempfile
+import time
+from collections import Counter, defaultdict
+from typing import Dict, List
+
+from fake_crcon import FakeCRCON
+
+
+class FakeAuthor:
+    def __init__(self, user_id: int):
+        self.id = user_id
+        self.bot = False
+        self.mention = f'<@{user_id}>'
+
+    def __str__(self):
+        return f'bench-user-{self.id}'
+
+
+class FakeChannel:
+    def __init__(self, channel_id: int):
+        self.id = channel_id
+        self.sent: List[str] = []
+
+    async def send(self, content: str):
+        self.sent.append(content)
+
+
+class FakeMessage:
+    def __init__(self, content: str, author: FakeAuthor, channel: FakeChannel):
+        self.content = content
+        self.author = author
+        self.channel = channel
+
+
+def percentile(values: List[float], q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(q / 100 * (len(ordered) - 1)))))
+    return ordered[index]
+
+
+def _format_ms(seconds: float) -> str:
+    return f'{seconds * 1000:8.2f} ms'
+
+
+async def run(args) -> Dict[str, object]:
+    rng = random.Random(args.seed)
+    servers = [
+        FakeCRCON(
+            name=f'S{i + 1}', server_index=i, players=args.players,
+            latency=args.latency_ms / 1000, jitter=args.jitter_ms / 1000,
+            failure_rate=args.failure_rate, payload_bytes=args.payload_bytes,
+            team_capacity=args.team_capacity, seed=args.seed + i,
+        )
+        for i in range(args.servers)
+    ]
+    urls = [await s.start() for s in servers]
+
+    # Konfiguration wird beim Erzeugen von MyBot gelesen (get_settings)
+    tmpdir = tempfile.mkdtemp(prefix='switchbot-bench-')
+    os.environ.update({
+        'API_BASE_URLS': ','.join(urls),
+        'API_TOKEN': 'bench',
+        'RCONS': '',
+        'ALLOWED_CHANNEL_ID': '1',
+        'DB_FILE': os.path.join(tmpdir, 'bench.db'),
+        'LOG_STREAM_ENABLED': 'true' if args.log_stream else 'false',
+    })
+    import bot as botmod
+    # Bot-Logs im Benchmark verwerfen (kein Logfile, keine Ausgabe auf stderr)
+    botmod.logger.addHandler(logging.NullHandler())
+
+    client = botmod.MyBot(intents=botmod.build_intents())
+    channel = FakeChannel(1)
+    # Queue-Meldungen landen im Fake-Channel statt im Discord-Cache
+    client.get_channel = lambda channel_id: channel if channel_id == channel.id else None
+    if args.log_stream:
+        # Log-Streams verbinden und warten, bis alle Live-Roster abgeglichen sind
+        client._start_log_streams()
+        while not all(client._live_roster(api) for api in client.api_clients):
+            await asyncio.sleep(0.01)
+
+    # Registrierte User auf zufällige Spieler der Fake-Server verteilen
+    users: List[FakeAuthor] = []
+    for n in range(args.users):
+        server = rng.choice(servers)
+        player_id = rng.choice(list(server.players))
+        client.db.add_user_with_name(100000 + n, player_id, server.players[player_id]['name'])
+        users.append(FakeAuthor(100000 + n))
+
+    # ---------------------- Phase 1: Commands ----------------------
+    latencies: Dict[str, List[float]] = defaultdict(list)
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def one_command():
+        author = rng.choice(users)
+        if rng.random() < args.reg_ratio:
+            server = rng.choice(servers)
+            kind, content = 'reg', f'!{client.settings.command_reg} {rng.choice(list(server.players))}'
+        else:
+            kind, content = 'switch', f'!{client.settings.command_switch}'
+        message = FakeMessage(content, author, channel)
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                await botmod.handle_command(client, message)
+            except Exception as e:
+                kind = f'{kind}_error'
+                botmod.logger.warning('Benchmark: Fehler in handle_command: %s', e)
+            latencies[kind].append(time.perf_counter() - start)
+
+    commands_start = time.perf_counter()
+    await asyncio.gather(*(one_command() for _ in range(args.commands)))
+    commands_elapsed = time.perf_counter() - commands_start
+    command_requests = sum((s.request_counts for s in servers), Counter())
+    command_bytes = sum(sum(s.bytes_sent.values()) for s in servers)
+
+    # ---------------------- Phase 2: Queue ----------------------
+    queued = sum(len(q) for q in client.switch_queues.values())
+    tick_durations: List[float] = []
+    queue_start = time.perf_counter()
+    for _ in range(args.queue_ticks):
+        if not any(client.switch_queues.values()):
+            break
+        # Spieler verlassen die Server, damit Plätze frei werden
+        for server in servers:
+            for player_id in rng.sample(list(server.players), min(args.churn, len(server.players))):
+                server.remove_player(player_id)
+        if args.log_stream:
+            # Log-Einträge zustellen lassen
+            await asyncio.sleep(0.05)
+        # Im Betrieb liegt zwischen zwei Durchläufen mindestens QUEUE_POLL_FAST (>= Gamestate-TTL)
+        client.team_counts_cache.invalidate()
+        tick_start = time.perf_counter()
+        await asyncio.gather(*(
+            client._process_queue_tick(api, queue)
+            for api, queue in client.switch_queues.items() if queue
+        ))
+        tick_durations.append(time.perf_counter() - tick_start)
+    queue_elapsed = time.perf_counter() - queue_start
+    await client.announcer.flush()
+    remaining = sum(len(q) for q in client.switch_queues.values())
+    total_requests = sum((s.request_counts for s in servers), Counter())
+
+    for task in list(client._background_tasks):
+        task.cancel()
+    for api in client.api_clients:
+        await api.close()
+    client.db.close()
+    for server in servers:
+        await server.stop()
+
+    return {
+        'latencies': latencies,
+        'commands_elapsed': commands_elapsed,
+        'command_requests': command_requests,
+        'command_bytes': command_bytes,
+        'queued': queued,
+        'remaining': remaining,
+        'tick_durations': tick_durations,
+        'queue_elapsed': queue_elapsed,
+        'total_requests': total_requests,
+        'replies': len(channel.sent),
+    }
+
+
+def report(args, result: Dict[str, object]):
+    print(f'Server: {args.servers} x {args.players} Spieler, Latenz {args.latency_ms} ms, '
+          f'Fehlerrate {args.failure_rate}, Payload {args.payload_bytes} B/Spieler')
+    print(f'Commands: {args.commands} (Concurrency {args.concurrency}) in '
+          f'{result["commands_elapsed"]:.2f} s -> {args.commands / max(result["commands_elapsed"], 1e-9):.1f} cmd/s')
+    for kind, values in sorted(result['latencies'].items()):
+        print(f'  {kind:<14} n={len(values):<5} p50={_format_ms(percentile(values, 50))} '
+              f'p99={_format_ms(percentile(values, 99))} max={_format_ms(max(values))}')
+
+    command_requests = result['command_requests']
+    print(f'RCON-Requests (Commands): {sum(command_requests.values())} '
+          f'({sum(command_requests.values()) / max(args.commands, 1):.2f} pro Command, '
+          f'{sum(command_requests.values()) / max(result["commands_elapsed"], 1e-9):.1f} req/s)')
+    for endpoint, count in sorted(command_requests.items()):
+        print(f'  {endpoint:<22} {count}')
+    print(f'  Antwort-Bytes gesamt: {result["command_bytes"] / 1024:.1f} KiB')
+
+    ticks = result['tick_durations']
+    print(f'Queue: {result["queued"]} eingereiht, {result["remaining"]} übrig nach {len(ticks)} Ticks '
+          f'({result["queue_elapsed"]:.2f} s)')
+    if ticks:
+        print(f'  Tick p50={_format_ms(percentile(ticks, 50))} p99={_format_ms(percentile(ticks, 99))}')
+    queue_requests = result['total_requests'] - command_requests
+    for endpoint, count in sorted(queue_requests.items()):
+        print(f'  {endpoint:<22} {count}')
+    print(f'Discord-Antworten: {result["replies"]}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark des Switch-Bots gegen Fake-CRCONs')
+    parser.add_argument('--servers', type=int, default=3)
+    parser.add_argument('--players', type=int, default=100, help='Spieler pro Server')
+    parser.add_argument('--team-capacity', type=int, default=50)
+    parser.add_argument('--latency-ms', type=float, default=20.0)
+    parser.add_argument('--jitter-ms', type=float, default=5.0)
+    parser.add_argument('--failure-rate', type=float, default=0.0)
+    parser.add_argument('--payload-bytes', type=int, default=256, help='Zusatzdaten pro Spieler')
+    parser.add_argument('--users', type=int, default=200, help='registrierte Discord-User')
+    parser.add_argument('--commands', type=int, default=300)
+    parser.add_argument('--concurrency', type=int, default=20)
+    parser.add_argument('--reg-ratio', type=float, default=0.1, help='Anteil !reg an allen Commands')
+    parser.add_argument('--queue-ticks', type=int, default=20)
+    parser.add_argument('--churn', type=int, default=2, help='Spieler, die pro Tick und Server gehen')
+    parser.add_argument('--log-stream', action='store_true', help='Roster live über /ws/logs fortschreiben')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+    report(args, asyncio.run(run(args)))
+
+
+if __name__ == '__main__':
+    main()
@@ -1,418 +1,880 @@
-import os
 import asyncio
-from dotenv import load_dotenv
+import aiohttp
 import discord
-from api_client import APIClient
+from announcer import Announcer
+from api_client import PLAYER_LOOKUP_FIELDS, APIClient
+from circuit_breaker import CircuitBreaker, CircuitOpenError
+from config import Settings, get_settings, load_translations
 from database import Database
-from utils import is_valid_steam_id
+import logging_setup
+from log_stream import LiveRoster, LogStreamSubscriber
+from queue_scheduler import QueueBackoff, slots_needed
+from metrics import COMMAND_SECONDS, ERRORS, QUEUE_DEPTH, QUEUE_WAIT_SECONDS, RATE_LIMITED, start_metrics_server
+from rate_limit import KeyedRateLimiter, TokenBucket
+from roster_cache import PlayerIdsSnapshot, RosterCache, TeamCounts, extract_players_map
+from utils import TTLCache, is_valid_steam_id
 import json
-from collections import deque
+import time
+from collections import Counter, deque
 import logging
-from logging.handlers import TimedRotatingFileHandler
-import gzip
-import shutil
-from typing import Optional, Tuple, List
-
-# ---------------------------------------------------------------------
-# .env laden
-# ---------------------------------------------------------------------
-load_dotenv()
-
-# Discord / App-Konfiguration
-TOKEN = os.getenv('DISCORD_BOT_TOKEN', '')
-ALLOWED_CHANNEL_ID = os.getenv('ALLOWED_CHANNEL_ID', '')
-DB_FILE = os.getenv('DB_FILE', 'bot.db')
-LANGUAGE = os.getenv('LANGUAGE', 'en')
-COMMAND_SWITCH = os.getenv('COMMAND_SWITCH', 'switch')
-COMMAND_REG = os.getenv('COMMAND_REG', 'reg')
-
-# RCON-Konfiguration
-# Gemeinsamer Token für alle RCONs
-API_TOKEN = os.getenv('API_TOKEN', '').strip()
-
-# Variante A (empfohlen bei gleichem Token): Kommagetrennte Base-URLs oder JSON-Array von Strings
-API_BASE_URLS = os.getenv('API_BASE_URLS', '').strip()
-
-# Variante B (Legacy/Fallback): Einzel-Base-URL
-API_BASE_URL = os.getenv('API_BASE_URL', '').strip()
-
-# Variante C (Legacy/Optional): JSON-Array aus Objekten [{name, base_url, api_token}]
-# – wird nur verwendet, wenn gesetzt; sonst ignoriert
-RCONS_ENV = os.getenv('RCONS', '').strip()
+from typing import Optional, Tuple, List, Dict, Sequence
 
 # ---------------------------------------------------------------------
 # Logging
 # ---------------------------------------------------------------------
-if not os.path.exists('logs'):
-    os.makedirs('logs')
-
+# Handler werden erst in setup_logging() (über main()) angehängt – der Import bleibt seiteneffektfrei
 logger = logging.getLogger('discord_bot')
-logger.setLevel(logging.DEBUG)
-
-handler = TimedRotatingFileHandler(
-    filename='logs/discord_bot.log',
-    when='midnight',
-    interval=1,
-    backupCount=7,
-    encoding='utf-8',
-)
-handler.suffix = "%Y%m%d"
-handler.setFormatter(logging.Formatter('%(asctime)s:%(levelname)s:%(name)s: %(message)s'))
-logger.addHandler(handler)
-
-def compress_old_logs():
-    for filename in os.listdir('logs'):
-        if filename.startswith('discord_bot.log.') and not filename.endswith('.gz'):
-            filepath = os.path.join('logs', filename)
-            gz_path = filepath + '.gz'
-            try:
-                with open(filepath, 'rb') as f_in, gzip.open(gz_path, 'wb') as f_out:
-                    shutil.copyfileobj(f_in, f_out)
-                os.remove(filepath)
-            except Exception as e:
-                logger.warning(f"Konnte {filepath} nicht komprimieren: {e}")
 
-compress_old_logs()
-
-# ---------------------------------------------------------------------
-# Translations
-# ---------------------------------------------------------------------
-with open('translations.json', 'r', encoding='utf-8') as file:
-    all_langs = json.load(file)
-    lang = all_langs.get(LANGUAGE, all_langs['en'])
+def setup_logging(settings: Optional[Settings] = None):
+    """Logging über eine Queue; Formatierung, Datei-I/O und Rotation laufen in einem eigenen Thread."""
+    cfg = settings or get_settings()
+    return logging_setup.setup_logging(
+        logger, log_dir=cfg.log_dir, level=cfg.log_level,
+        log_format=cfg.log_format, backup_count=cfg.log_backup_count,
+    )
 
 # ---------------------------------------------------------------------
 # Discord-Intents
 # ---------------------------------------------------------------------
-intents = discord.Intents.default()
-intents.messages = True
-intents.message_content = True
-
-# ---------------------------------------------------------------------
-# Globale Warteschlange (player_id = Steam64)
-# ---------------------------------------------------------------------
-switch_queue = deque()
-
-# ---------------------------------------------------------------------
-# Helpers
-# ---------------------------------------------------------------------
-def _extract_players_map(players_response: dict) -> dict:
-    if not isinstance(players_response, dict):
-        return {}
-    result = players_response.get('result', {})
-    if not isinstance(result, dict):
-        return {}
-    players = result.get('players', {})
-    return players if isinstance(players, dict) else {}
-
-def _find_player_by_id_or_name(players_map: dict, player_id: str, player_name: Optional[str] = None) -> Tuple[Optional[str], Optional[dict]]:
-    if not isinstance(players_map, dict):
-        return None, None
-
-    if player_id in players_map:
-        return player_id, players_map[player_id]
-
-    for pid, pdata in players_map.items():
-        if not isinstance(pdata, dict):
-            continue
-        for k in ('steam_id_64', 'player_id', 'id'):
-            if str(pdata.get(k, '')).strip() == str(player_id).strip():
-                return pid, pdata
-
-    if player_name:
-        low = str(player_name).strip().lower()
-        for pid, pdata in players_map.items():
-            if isinstance(pdata, dict) and str(pdata.get('name', '')).strip().lower() == low:
-                return pid, pdata
-
-    return None, None
+def build_intents() -> discord.Intents:
+    intents = discord.Intents.default()
+    intents.messages = True
+    intents.message_content = True
+    return intents
 
 # ---------------------------------------------------------------------
 # Bot-Klasse
 # ---------------------------------------------------------------------
 class MyBot(discord.Client):
-    def __init__(self, intents):
+    def __init__(self, intents, settings: Optional[Settings] = None):
         super().__init__(intents=intents)
-        self.db = Database(DB_FILE)
+        self.settings = settings or get_settings()
+        self.lang = load_translations(self.settings.language)
+        cfg = self.settings
+        self.user_rate_limiter = KeyedRateLimiter(cfg.rate_limit_user_rate, cfg.rate_limit_user_burst)
+        self.global_rate_limiter = TokenBucket(cfg.rate_limit_global_rate, cfg.rate_limit_global_burst)
+        self.db = Database(self.settings.db_file, cache_size=self.settings.db_cache_size,
+                           cache_ttl=self.settings.db_cache_ttl)
         self.api_clients: List[APIClient] = self._load_rcons()
-        logger.debug(f'Bot-Instanz initialisiert. RCON-Clients: {len(self.api_clients)}')
+        self._rcons_by_name: Dict[str, APIClient] = {getattr(c, '_rcon_name', '?'): c for c in self.api_clients}
+        # Discord-Channel -> zuständige RCONs (vorberechnet, O(1)-Prüfung in on_message)
+        self.channel_rcons: Dict[int, Tuple[APIClient, ...]] = self._load_channel_routes()
+        # RCON -> Channel für Meldungen zu Queue-Einträgen ohne gespeicherten Channel
+        self._home_channels: Dict[APIClient, int] = {}
+        for channel_id, scope in self.channel_rcons.items():
+            for api in scope:
+                self._home_channels.setdefault(api, channel_id)
+        self.roster_cache = RosterCache(self.settings.roster_cache_ttl)
+        self.player_ids_cache = RosterCache(self.settings.roster_cache_ttl, builder=PlayerIdsSnapshot)
+        # Teamstärken pro RCON (kurz gecacht, nach Switches lokal fortgeschrieben)
+        self.team_counts_cache = RosterCache(self.settings.gamestate_cache_ttl, builder=TeamCounts)
+        # Laufende switch_player_now pro RCON und Zielteam (Reservierungen, unabhängig vom Cache)
+        self._pending_switches: Dict[APIClient, Counter] = {c: Counter() for c in self.api_clients}
+        # Erfolgreiche Switches (Zeitpunkt, Zielteam, player_id), bis danach geladene Snapshots sie enthalten
+        self._recent_switches: Dict[APIClient, deque] = {c: deque() for c in self.api_clients}
+        # Optional: live aus dem Log-Stream fortgeschriebene Roster pro RCON
+        self.live_rosters: Dict[APIClient, LiveRoster] = {c: LiveRoster() for c in self.api_clients}
+        self.log_subscribers: Dict[APIClient, LogStreamSubscriber] = {}
+        # Weckt den Queue-Worker eines RCONs (neuer Eintrag oder laut Log-Stream freier Platz)
+        self.queue_events: Dict[APIClient, asyncio.Event] = {c: asyncio.Event() for c in self.api_clients}
+        # Steam64 -> Profilname (für !reg und den Bulk-Import)
+        self.profile_cache = TTLCache(self.settings.profile_cache_ttl)
+        # Eine Warteschlange pro RCON (player_id = Steam64)
+        self.switch_queues: Dict[APIClient, deque] = {c: deque() for c in self.api_clients}
+        # Plätze, die !switch-Aufrufe während des DB-Inserts reservieren (hält MAX_QUEUE_SIZE ein)
+        self._queue_reserved: Counter = Counter()
+        # Gebündelte Queue-Meldungen (sendet außerhalb des Switch-Pfads)
+        self.announcer = Announcer(self.settings.announce_window)
+        # Steam64 -> Name des RCONs, auf dem der Spieler zuletzt gefunden wurde
+        self.last_seen_rcon: Dict[str, str] = {}
+        self._background_tasks = set()
+        QUEUE_DEPTH.set_function(lambda: {
+            (getattr(c, '_rcon_name', '?'),): len(q) for c, q in self.switch_queues.items()
+        })
+        logger.debug('Bot-Instanz initialisiert. RCON-Clients: %s', len(self.api_clients))
+
+    def _build_client(self, name: str, base_url: str, token: str,
+                      connect_timeout: Optional[float] = None,
+                      read_timeout: Optional[float] = None,
+                      team_capacity: Optional[int] = None) -> APIClient:
+        cfg = self.settings
+        c = APIClient(
+            base_url, token,
+            connect_timeout=cfg.rcon_connect_timeout if connect_timeout is None else connect_timeout,
+            read_timeout=cfg.rcon_read_timeout if read_timeout is None else read_timeout,
+            breaker=CircuitBreaker(cfg.rcon_failure_threshold, cfg.rcon_reset_timeout),
+            rate_limiter=TokenBucket(cfg.rate_limit_rcon_rate, cfg.rate_limit_rcon_burst),
+        )
+        setattr(c, '_rcon_name', name)
+        setattr(c, '_team_capacity', cfg.team_capacity if team_capacity is None else team_capacity)
+        return c
 
     def _load_rcons(self) -> List[APIClient]:
         clients: List[APIClient] = []
+        cfg = self.settings
 
         # 1) RCONS (Objektliste) – nur falls gesetzt (Legacy/Optional)
-        if RCONS_ENV:
+        if cfg.rcons:
             try:
-                parsed = json.loads(RCONS_ENV)
+                parsed = json.loads(cfg.rcons)
                 if isinstance(parsed, list):
                     for idx, item in enumerate(parsed):
                         if not isinstance(item, dict):
-                            logger.warning(f"RCONS[{idx}] ist kein Objekt; wird übersprungen.")
+                            logger.warning("RCONS[%s] ist kein Objekt; wird übersprungen.", idx)
                             continue
                         name = str(item.get('name', f'RCON{idx}'))
                         base_url = str(item.get('base_url', '')).rstrip('/')
-                        token = str(item.get('api_token', API_TOKEN)).strip()
+                        token = str(item.get('api_token', cfg.api_token)).strip()
                         if not base_url or not token:
-                            logger.warning(f"RCONS[{idx}] unvollständig (base_url/api_token fehlen); übersprungen.")
+                            logger.warning("RCONS[%s] unvollständig (base_url/api_token fehlen); übersprungen.", idx)
                             continue
-                        c = APIClient(base_url, token)
-                        setattr(c, '_rcon_name', name)
-                        clients.append(c)
+                        clients.append(self._build_client(
+                            name, base_url, token,
+                            connect_timeout=float(item.get('connect_timeout', cfg.rcon_connect_timeout)),
+                            read_timeout=float(item.get('read_timeout', cfg.rcon_read_timeout)),
+                            team_capacity=int(item.get('team_capacity', cfg.team_capacity)),
+                        ))
                 else:
                     logger.error("RCONS ist gesetzt, aber kein JSON-Array.")
             except Exception as e:
-                logger.error(f"Fehler beim Parsen von RCONS: {e}")
+                logger.error("Fehler beim Parsen von RCONS: %s", e)
 
         # 2) API_BASE_URLS (empfohlen) – gleiche Tokens, unterschiedliche Base-URLs
-        if not clients and API_BASE_URLS:
+        if not clients and cfg.api_base_urls:
             urls: List[str] = []
             # JSON-Array?
-            if API_BASE_URLS.startswith('['):
+            if cfg.api_base_urls.startswith('['):
                 try:
-                    parsed = json.loads(API_BASE_URLS)
+                    parsed = json.loads(cfg.api_base_urls)
                     if isinstance(parsed, list):
                         urls = [str(u).strip().rstrip('/') for u in parsed if str(u).strip()]
                 except Exception as e:
-                    logger.error(f"Fehler beim Parsen von API_BASE_URLS (JSON): {e}")
+                    logger.error("Fehler beim Parsen von API_BASE_URLS (JSON): %s", e)
             # Kommagetrennte Liste
             if not urls:
-                urls = [u.strip().rstrip('/') for u in API_BASE_URLS.split(',') if u.strip()]
+                urls = [u.strip().rstrip('/') for u in cfg.api_base_urls.split(',') if u.strip()]
 
             for i, base_url in enumerate(urls):
                 if not base_url:
                     continue
-                if not API_TOKEN:
+                if not cfg.api_token:
                     logger.error("API_TOKEN fehlt; kann Client nicht bauen.")
                     continue
-                c = APIClient(base_url, API_TOKEN)
-                setattr(c, '_rcon_name', f'RCON{i+1}')
-                clients.append(c)
+                clients.append(self._build_client(f'RCON{i+1}', base_url, cfg.api_token))
 
         # 3) Fallback: Single-URL
-        if not clients and API_BASE_URL:
-            if not API_TOKEN:
+        if not clients and cfg.api_base_url:
+            if not cfg.api_token:
                 logger.error("API_TOKEN fehlt; Single-RCON kann nicht erzeugt werden.")
             else:
-                c = APIClient(API_BASE_URL.rstrip('/'), API_TOKEN)
-                setattr(c, '_rcon_name', 'default')
-                clients.append(c)
+                clients.append(self._build_client('default', cfg.api_base_url.rstrip('/'), cfg.api_token))
 
         if not clients:
             logger.error("Keine RCON-Konfiguration gefunden. Bitte .env prüfen.")
         return clients
 
+    def _load_channel_routes(self) -> Dict[int, Tuple[APIClient, ...]]:
+        routes: Dict[int, Tuple[APIClient, ...]] = {}
+        cfg = self.settings
+
+        # 1) CHANNEL_RCONS (mehrere Communities) – Channel -> Teilmenge der RCONs
+        if cfg.channel_rcons:
+            try:
+                parsed = json.loads(cfg.channel_rcons)
+                if isinstance(parsed, dict):
+                    for channel_id, names in parsed.items():
+                        if names in ('*', None, []):
+                            routes[int(channel_id)] = tuple(self.api_clients)
+                            continue
+                        if isinstance(names, str):
+                            names = [n.strip() for n in names.split(',') if n.strip()]
+                        unknown = [n for n in names if n not in self._rcons_by_name]
+                        if unknown:
+                            logger.warning("CHANNEL_RCONS[%s]: unbekannte RCONs %s; übersprungen.", channel_id, unknown)
+                        scope = tuple(self._rcons_by_name[n] for n in names if n in self._rcons_by_name)
+                        if scope:
+                            routes[int(channel_id)] = scope
+                else:
+                    logger.error("CHANNEL_RCONS ist gesetzt, aber kein JSON-Objekt.")
+            except Exception as e:
+                logger.error("Fehler beim Parsen von CHANNEL_RCONS: %s", e)
+
+        # 2) ALLOWED_CHANNEL_ID – ein (oder mehrere) Channel für alle RCONs
+        if not routes and cfg.allowed_channel_id:
+            for part in cfg.allowed_channel_id.split(','):
+                if part.strip().isdigit():
+                    routes[int(part)] = tuple(self.api_clients)
+
+        if not routes:
+            logger.error("Kein Discord-Channel konfiguriert (CHANNEL_RCONS/ALLOWED_CHANNEL_ID).")
+        return routes
+
     async def setup_hook(self):
-        self.loop.create_task(self.process_switch_queue())
+        cfg = self.settings
+        if cfg.metrics_port:
+            try:
+                await start_metrics_server(cfg.metrics_host, int(cfg.metrics_port))
+                logger.info('Metrics-Endpunkt: http://%s:%s/metrics', cfg.metrics_host, cfg.metrics_port)
+            except Exception as e:
+                logger.error('Metrics-Endpunkt konnte nicht gestartet werden: %s', e)
+        await self._restore_switch_queues()
+        self.last_seen_rcon = await self.db.load_player_locations_async()
+        # Ein Worker pro RCON, damit ein volles Team nicht die anderen Server blockiert
+        for api in self.api_clients:
+            self._spawn(self.process_switch_queue(api))
+        if self.settings.log_stream_enabled:
+            self._start_log_streams()
+        self._spawn(self.probe_unhealthy_rcons())
 
     async def on_ready(self):
-        logger.info(lang['logged_in'].format(bot_name=self.user))
-        logger.info(lang.get('api_initialized', 'API initialized.'))
+        logger.info(self.lang['logged_in'].format(bot_name=self.user))
+        logger.info(self.lang.get('api_initialized', 'API initialized.'))
 
     async def on_message(self, message: discord.Message):
-        try:
-            if message.author.bot or message.channel.id != int(ALLOWED_CHANNEL_ID):
-                return
-        except Exception:
+        if message.author.bot or message.channel.id not in self.channel_rcons:
+            return
+
+        # Rate Limits vor jeder DB-/HTTP-Arbeit prüfen; Verworfenes wird nicht beantwortet
+        if not self.user_rate_limiter.try_acquire(message.author.id):
+            RATE_LIMITED.inc(scope='user')
+            logger.debug('Rate Limit (User) für %s; Nachricht verworfen.', message.author)
+            return
+        if not self.global_rate_limiter.try_acquire():
+            RATE_LIMITED.inc(scope='global')
+            logger.debug('Globales Rate Limit erreicht; Nachricht von %s verworfen.', message.author)
             return
 
-        logger.debug(f'Nachricht empfangen von {message.author}: {message.content}')
-        await handle_command(self, message)
+        logger.debug('Nachricht empfangen von %s: %s', message.author, message.content)
+        with COMMAND_SECONDS.time(command=_command_type(self.settings, message.content)):
+            try:
+                await handle_command(self, message)
+            except Exception as e:
+                ERRORS.inc(component='handle_command')
+                logger.error('Fehler in handle_command: %s', e)
+
+    async def close(self):
+        # Queue-Worker, Health-Checks und Log-Streams beenden, bevor die Sessions geschlossen
+        # werden (sonst verbinden sich die Log-Streams mit einer neuen Session wieder)
+        tasks = list(self._background_tasks)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        # Ausstehende Queue-Meldungen noch senden, solange die Discord-Verbindung steht
+        await self.announcer.flush()
+        for api in self.api_clients:
+            try:
+                await api.close()
+            except Exception as e:
+                logger.warning("Konnte Session für RCON '%s' nicht schließen: %s", getattr(api, '_rcon_name', '?'), e)
+        await super().close()
+        await asyncio.to_thread(self.db.close)
+
+    # ---------------------- Queue-Persistenz ------------------------
+    async def _restore_switch_queues(self):
+        """Lädt die persistierte Warteschlange (ein Bulk-Query) in die RCON-Queues."""
+        if not self.api_clients:
+            return
+        items = await self.db.load_switch_queue_async()
+        for item in items:
+            # Unbekannter RCON (z.B. nach Konfig-Änderung): Eintrag folgt dem Spieler später
+            scope = self.channel_rcons.get(item.get('channel_id')) or self.api_clients
+            api = self._rcons_by_name.get(item.get('rcon_name'), scope[0])
+            self.switch_queues[api].append(item)
+        if items:
+            logger.info('%s Queue-Einträge aus der Datenbank wiederhergestellt.', len(items))
+
+    def _is_queued(self, player_id: str, discord_id) -> bool:
+        """Ob Spieler oder Discord-User schon in irgendeiner RCON-Queue stehen (wie die UNIQUE-Keys der DB)."""
+        return any(
+            str(item['player_id']) == str(player_id) or str(item['discord_id']) == str(discord_id)
+            for queue in self.switch_queues.values() for item in queue
+        )
+
+    async def _enqueue_switch(self, api: APIClient, item: dict) -> Optional[bool]:
+        """
+        True: eingereiht, False: Spieler/Discord-User steht schon in einer Queue,
+        None: Queue des RCONs voll (laufende Inserts zählen mit).
+        """
+        if len(self.switch_queues[api]) + self._queue_reserved[api] >= self.settings.max_queue_size:
+            return None
+        # Platz vor dem await reservieren, sonst passieren gleichzeitige Aufrufe alle die Prüfung
+        self._queue_reserved[api] += 1
+        try:
+            added = await self.db.enqueue_switch_async(
+                item['player_id'], item['discord_id'], item.get('player_name'),
+                item['target_team'], item['rcon_name'], item['enqueued_at'], item.get('channel_id'),
+            )
+        finally:
+            self._queue_reserved[api] -= 1
+        if not added:
+            return False
+        self.switch_queues[api].append(item)
+        self.queue_events[api].set()
+        return True
+
+    async def _dequeue_switch(self, api: APIClient, item: dict, outcome: str):
+        queue = self.switch_queues[api]
+        if item in queue:
+            queue.remove(item)
+        QUEUE_WAIT_SECONDS.observe(
+            max(0.0, time.time() - float(item.get('enqueued_at') or time.time())),
+            rcon=getattr(api, '_rcon_name', '?'), outcome=outcome,
+        )
+        await self.db.dequeue_switch_async(item['player_id'])
+
+    async def _move_switch(self, src: APIClient, dst: APIClient, item: dict):
+        queue = self.switch_queues[src]
+        if item in queue:
+            queue.remove(item)
+        item['rcon_name'] = getattr(dst, '_rcon_name', '?')
+        await self.db.update_switch_rcon_async(item['player_id'], item['rcon_name'])
+        self.switch_queues[dst].append(item)
+        self.queue_events[dst].set()
+
+    # ---------------------- RCON-Health ------------------------
+    def _healthy_rcons(self, scope: Optional[Sequence[APIClient]] = None) -> List[APIClient]:
+        """Verfügbare RCONs (optional nur aus `scope`), solche ohne aktuelle Fehler zuerst."""
+        available = [c for c in (self.api_clients if scope is None else scope) if c.is_available]
+        return sorted(available, key=lambda c: c.breaker.consecutive_failures)
+
+    async def probe_unhealthy_rcons(self):
+        """Prüft RCONs mit offenem Circuit im Hintergrund und gibt sie bei Erfolg wieder frei."""
+        await self.wait_until_ready()
+        while not self.is_closed():
+            for api in self.api_clients:
+                if not api.breaker.probe_due():
+                    continue
+                rname = getattr(api, '_rcon_name', '?')
+                try:
+                    await api.probe()
+                    logger.info("RCON '%s' wieder erreichbar.", rname)
+                except Exception as e:
+                    logger.warning("RCON '%s' weiterhin nicht erreichbar: %s", rname, e)
+            await asyncio.sleep(5)
+
+    # ---------------------- Live-Roster (Log-Stream) ------------------------
+    def _start_log_streams(self):
+        for api in self.api_clients:
+            subscriber = LogStreamSubscriber(
+                api, self.live_rosters[api],
+                on_slot_opened=lambda team, api=api: self._on_slot_opened(api),
+                on_connected=lambda api=api: self._spawn(self._reconcile_roster(api)),
+            )
+            self.log_subscribers[api] = subscriber
+            self._spawn(subscriber.run())
+            self._spawn(self._reconcile_rosters_periodically(api))
+
+    def _on_slot_opened(self, api: APIClient):
+        # Gecachte Teamstärken sind überholt; Queue-Worker sofort wecken
+        self.team_counts_cache.invalidate(api)
+        self.queue_events[api].set()
+
+    async def _reconcile_roster(self, api: APIClient):
+        """Gleicht die Live-Roster mit der vollen Spielerliste ab."""
+        try:
+            players_resp = await self._get_detailed_players_async(api)
+            self.live_rosters[api].reconcile(extract_players_map(players_resp))
+        except Exception as e:
+            logger.warning("Roster-Abgleich für RCON '%s' fehlgeschlagen: %s", getattr(api, '_rcon_name', '?'), e)
+
+    async def _reconcile_rosters_periodically(self, api: APIClient):
+        while not self.is_closed():
+            await asyncio.sleep(self.settings.roster_reconcile_interval)
+            subscriber = self.log_subscribers.get(api)
+            if subscriber and subscriber.connected:
+                await self._reconcile_roster(api)
+
+    def _live_roster(self, api: APIClient) -> Optional[LiveRoster]:
+        """Live-Roster, falls Log-Stream verbunden und Roster abgeglichen, sonst None."""
+        subscriber = self.log_subscribers.get(api)
+        roster = self.live_rosters.get(api)
+        if subscriber and subscriber.connected and roster is not None and roster.is_synced:
+            return roster
+        return None
+
+    async def _roster_for(self, api: APIClient):
+        live = self._live_roster(api)
+        if live is not None:
+            return live
+        snapshot = await self.roster_cache.get(api, self._get_detailed_players_async)
+        # Eigene Switches seit dem Request im Snapshot nachziehen (auch wenn er währenddessen geladen wurde)
+        for _, team, player_id in self._switches_since(api, snapshot.fetched_at):
+            snapshot.set_team(player_id, team)
+        return snapshot
+
+    async def _wait_for_wakeup(self, api: APIClient, timeout: Optional[float] = None):
+        """Schläft bis zum Timeout (None = unbegrenzt) oder bis der Queue-Worker geweckt wird."""
+        event = self.queue_events[api]
+        try:
+            await asyncio.wait_for(event.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        event.clear()
 
     # ---------------------- Async-Wrapper für APIClient ----------------------
     async def _get_detailed_players_async(self, client: APIClient) -> dict:
-        return await asyncio.to_thread(client.get_detailed_players)
+        # Nur die für die Suche nötigen Felder behalten (Stats/Loadouts/Profile verwerfen)
+        return await client.get_detailed_players(fields=PLAYER_LOOKUP_FIELDS)
+
+    async def _get_player_ids_async(self, client: APIClient) -> dict:
+        return await client.get_player_ids()
 
     async def _get_gamestate_async(self, client: APIClient) -> dict:
-        return await asyncio.to_thread(client.get_gamestate)
+        return await client.get_gamestate()
+
+    async def _fetch_team_counts_async(self, client: APIClient) -> dict:
+        """Teamstärken im Gamestate-Format: aus der Live-Roster, falls verfügbar, sonst per get_gamestate."""
+        live = self._live_roster(client)
+        if live is not None:
+            return {'result': {
+                'num_allied_players': live.team_count('allies'),
+                'num_axis_players': live.team_count('axis'),
+            }}
+        return await self._get_gamestate_async(client)
+
+    def _team_capacity(self, client: APIClient) -> int:
+        return getattr(client, '_team_capacity', self.settings.team_capacity)
 
     async def _switch_player_now_async(self, client: APIClient, player_id: str) -> dict:
-        return await asyncio.to_thread(client.switch_player_now, player_id)
+        return await client.switch_player_now(player_id)
+
+    def _switches_since(self, client: APIClient, since: float) -> List[Tuple[float, str, str]]:
+        """Erfolgreiche Switches ab `since`; ältere als jeder noch gültige Snapshot werden verworfen."""
+        recent = self._recent_switches[client]
+        horizon = time.monotonic() - max(self.settings.roster_cache_ttl, self.settings.gamestate_cache_ttl)
+        while recent and recent[0][0] < horizon:
+            recent.popleft()
+        return [entry for entry in recent if entry[0] >= since]
+
+    def _team_counts_now(self, client: APIClient, snapshot: TeamCounts) -> Dict[str, int]:
+        """
+        Teamstärken laut Snapshot, fortgeschrieben um die seit dem Gamestate-Request erfolgreichen
+        Switches (ein Team +1, das andere -1) und um laufende Switches (Zielteam +1).
+        """
+        counts = dict(snapshot.counts)
+        for _, team, _ in self._switches_since(client, snapshot.fetched_at):
+            other = 'allies' if team == 'axis' else 'axis'
+            counts[team] = counts.get(team, 0) + 1
+            counts[other] = max(0, counts.get(other, 0) - 1)
+        for team, n in self._pending_switches[client].items():
+            counts[team] = counts.get(team, 0) + n
+        return counts
+
+    async def _try_switch(self, client: APIClient, player_id: str, target_team: str) -> Optional[bool]:
+        """
+        Switcht den Spieler, falls im Zielteam laut (gecachten) Teamstärken plus laufender Switches
+        Platz ist. Der Platz wird vor dem Request reserviert; Reservierungen und abgeschlossene Switches
+        liegen außerhalb des Caches und gelten daher auch für einen inzwischen neu geladenen Gamestate.
+        Rückgabe: None = Zielteam voll, sonst ob der Switch geklappt hat.
+        """
+        snapshot = await self.team_counts_cache.get(client, self._fetch_team_counts_async)
+        if self._team_counts_now(client, snapshot)[target_team] >= self._team_capacity(client):
+            return None
+        pending = self._pending_switches[client]
+        pending[target_team] += 1
+        try:
+            response = await self._switch_player_now_async(client, player_id)
+        except Exception:
+            # Ausgang unklar – Spielerliste beim nächsten Mal neu laden
+            self.roster_cache.invalidate(client)
+            raise
+        finally:
+            pending[target_team] -= 1
+        switched = isinstance(response, dict) and response.get('result') is True and not response.get('failed')
+        if switched:
+            # Teamstärken und Roster-Snapshots werden darüber lokal fortgeschrieben
+            self._recent_switches[client].append((time.monotonic(), target_team, str(player_id)))
+            # Die Live-Roster direkt, sonst fehlt der Switch bis zum (verzögerten) TEAMSWITCH-Log
+            self.live_rosters[client].set_team(str(player_id), target_team)
+        else:
+            # Evtl. waren die Zahlen veraltet – beim nächsten Mal neu laden
+            self.team_counts_cache.invalidate(client)
+        return switched
+
+    async def _resolve_player_name(
+        self, steam_id: str, offset: int = 0, scope: Optional[Sequence[APIClient]] = None
+    ) -> Optional[str]:
+        """
+        Ermittelt den Profilnamen zu einer Steam64 (gecacht). Es werden nur Namen angefragt
+        (num_sessions=0); bei Fehlern wird der nächste erreichbare RCON versucht.
+        `offset` verteilt viele Anfragen (Bulk-Import) reihum auf die RCONs.
+        """
+        cached = self.profile_cache.get(steam_id)
+        if cached is not None:
+            return cached
+
+        clients = self._healthy_rcons(scope)
+        if clients:
+            offset %= len(clients)
+            clients = clients[offset:] + clients[:offset]
+        for api in clients:
+            try:
+                player_info = await api.get_player_profile(steam_id, num_sessions=0)
+            except Exception as e:
+                logger.warning("get_player_profile für %s auf RCON '%s' fehlgeschlagen: %s", steam_id, getattr(api, '_rcon_name', '?'), e)
+                continue
+            if (isinstance(player_info, dict)
+                and not player_info.get('failed')
+                and isinstance(player_info.get('result'), dict)
+                and player_info['result'].get('names')):
+                player_name = player_info['result']['names'][0].get('name', steam_id)
+                self.profile_cache.put(steam_id, player_name)
+                return player_name
+        return None
+
+    async def _lookup_player_on_rcon(
+        self, client: APIClient, player_id: str, player_name: Optional[str], locate_first: bool = False
+    ) -> Optional[Tuple[str, dict, bool]]:
+        """
+        Sucht den Spieler auf einem einzelnen RCON (über den Roster-Snapshot).
+        Mit locate_first (und LOCATE_MODE=ids) wird zuerst per get_player_ids geprüft, ob der
+        Spieler überhaupt auf dem Server ist; nur dann wird die volle Spielerliste geladen.
+        Rückgabe: (found_id, pdata, per_id_gefunden) oder None
+        """
+        if locate_first and self.settings.locate_mode == 'ids' and self._live_roster(client) is None:
+            ids = await self.player_ids_cache.get(client, self._get_player_ids_async)
+            if not ids.contains(player_id, player_name):
+                return None
+        snapshot = await self._roster_for(client)
+        found_id, pdata = snapshot.find_by_id(player_id)
+        if found_id:
+            return found_id, pdata, True
+        found_id, pdata = snapshot.find_by_name(player_name)
+        if found_id:
+            return found_id, pdata, False
+        return None
+
+    def _spawn(self, coro):
+        """Startet eine Hintergrund-Task und hält eine Referenz, bis sie fertig ist."""
+        task = asyncio.create_task(coro)
+        self._background_tasks.add(task)
+        task.add_done_callback(self._background_tasks.discard)
+        return task
+
+    def _remember_rcon(self, player_id: str, client: APIClient):
+        rname = getattr(client, '_rcon_name', '?')
+        if self.last_seen_rcon.get(str(player_id)) == rname:
+            return
+        self.last_seen_rcon[str(player_id)] = rname
+        # Persistieren nur bei Änderung und ohne den Lookup aufzuhalten
+        self._spawn(self.db.set_player_location_async(player_id, rname, time.time()))
 
     async def _find_player_across_rcons(
-        self, player_id: str, player_name: Optional[str] = None
+        self, player_id: str, player_name: Optional[str] = None,
+        scope: Optional[Sequence[APIClient]] = None,
     ) -> Tuple[Optional[APIClient], Optional[str], Optional[dict]]:
         """
-        Sucht den Spieler über alle konfigurierten RCONs.
+        Sucht den Spieler zuerst auf dem RCON, auf dem er zuletzt gesehen wurde, und erst bei
+        einem Fehlschlag parallel über alle übrigen erreichbaren RCONs (RCONs mit offenem Circuit
+        werden übersprungen; `scope` beschränkt die Suche auf die RCONs eines Channels). Der erste Treffer per ID gewinnt, alle übrigen Requests werden abgebrochen.
+        Ein Treffer nur per Name wird als Fallback gehalten, bis alle RCONs geantwortet haben.
         Rückgabe: (client, found_id, pdata) oder (None, None, None)
         """
-        for client in self.api_clients:
+        clients = self._healthy_rcons(scope)
+        if not clients:
+            return None, None, None
+
+        name_match: Optional[Tuple[APIClient, str, dict]] = None
+        preferred = self._rcons_by_name.get(self.last_seen_rcon.get(str(player_id), ''))
+        if preferred in clients:
             try:
-                players_resp = await self._get_detailed_players_async(client)
-                players_map = _extract_players_map(players_resp)
-                found_id, pdata = _find_player_by_id_or_name(players_map, player_id, player_name)
-                if found_id:
-                    rname = getattr(client, '_rcon_name', '?')
-                    logger.debug(f"Spieler {player_name or player_id} gefunden auf RCON '{rname}'")
-                    return client, found_id, pdata
+                hit = await self._lookup_player_on_rcon(preferred, player_id, player_name)
             except Exception as e:
-                rname = getattr(client, '_rcon_name', '?')
-                logger.warning(f"Fehler bei get_detailed_players auf RCON '{rname}': {e}")
+                logger.warning("Fehler bei get_detailed_players auf RCON '%s': %s", getattr(preferred, '_rcon_name', '?'), e)
+                hit = None
+            if hit and hit[2]:
+                return preferred, hit[0], hit[1]
+            if hit:
+                name_match = (preferred, hit[0], hit[1])
+            clients = [c for c in clients if c is not preferred]
+
+        tasks = {
+            asyncio.create_task(self._lookup_player_on_rcon(c, player_id, player_name, locate_first=True)): c
+            for c in clients
+        }
+        pending = set(tasks)
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    client = tasks[task]
+                    rname = getattr(client, '_rcon_name', '?')
+                    try:
+                        hit = task.result()
+                    except Exception as e:
+                        logger.warning("Fehler bei get_detailed_players auf RCON '%s': %s", rname, e)
+                        continue
+                    if not hit:
+                        continue
+                    found_id, pdata, by_id = hit
+                    if by_id:
+                        logger.debug("Spieler %s gefunden auf RCON '%s'", player_name or player_id, rname)
+                        self._remember_rcon(player_id, client)
+                        return client, found_id, pdata
+                    if name_match is None:
+                        name_match = (client, found_id, pdata)
+        finally:
+            for task in pending:
+                task.cancel()
+
+        if name_match:
+            rname = getattr(name_match[0], '_rcon_name', '?')
+            logger.debug("Spieler %s per Name gefunden auf RCON '%s'", player_name or player_id, rname)
+            return name_match
         return None, None, None
 
     # ---------------------- Queue-Verarbeitung ------------------------
-    async def process_switch_queue(self):
+    def _item_route(self, client: APIClient, item: dict):
+        """Channel und RCON-Suchbereich eines Queue-Eintrags (Channel des !switch-Befehls)."""
+        channel_id = item.get('channel_id')
+        if channel_id not in self.channel_rcons:
+            # Kein/nicht mehr konfigurierter Channel: Channel des RCONs verwenden
+            channel_id = self._home_channels.get(client)
+        if channel_id is None:
+            return None, None
+        return self.get_channel(channel_id), self.channel_rcons.get(channel_id)
+
+    async def process_switch_queue(self, client: APIClient):
+        """
+        Worker eines RCONs: schläft bei leerer Queue, bis etwas eingereiht wird. Sonst richtet sich
+        das Intervall nach den Teamstärken (schnell, wenn nur ein Platz fehlt; Backoff, solange sie
+        sich nicht bewegen). Der Log-Stream weckt den Worker zusätzlich bei jedem freien Platz.
+        """
         await self.wait_until_ready()
-        try:
-            channel = self.get_channel(int(ALLOWED_CHANNEL_ID))
-        except Exception:
-            channel = None
-
+        cfg = self.settings
+        queue = self.switch_queues[client]
+        backoff = QueueBackoff(cfg.queue_poll_interval, cfg.queue_poll_fast, cfg.queue_poll_max)
         while not self.is_closed():
-            if switch_queue:
-                item = switch_queue[0]
-                player_id = item['player_id']
-                player_name = item.get('player_name')
-                target_team = item['target_team']
+            if not queue:
+                backoff.reset()
+                await self._wait_for_wakeup(client)
+                continue
+            delay = backoff.base
+            if not client.is_available:
+                logger.debug("Queue für RCON '%s' pausiert (Circuit offen).", getattr(client, '_rcon_name', '?'))
+            else:
+                try:
+                    team_counts = await self._process_queue_tick(client, queue)
+                    if team_counts is not None:
+                        needed = slots_needed(
+                            team_counts, {item['target_team'] for item in queue}, self._team_capacity(client)
+                        )
+                        delay = backoff.next_delay(team_counts, needed)
+                except Exception as e:
+                    ERRORS.inc(component='process_switch_queue')
+                    rname = getattr(client, '_rcon_name', '?')
+                    logger.error("Fehler in process_switch_queue auf RCON '%s': %s", rname, e)
+            if queue:
+                await self._wait_for_wakeup(client, delay)
 
-                logger.debug(f'Queue: {player_name or player_id} -> Zielteam {target_team}')
+    async def _process_queue_tick(self, client: APIClient, queue: deque) -> Optional[Dict[str, int]]:
+        """
+        Arbeitet alle Einträge einer RCON-Queue ab, für die im Zielteam Platz ist.
+        Meldungen gehen an den Channel, in dem der Eintrag angelegt wurde.
+        Die Teamstärken kommen aus dem kurzlebigen Cache (bzw. der Live-Roster) und werden
+        nach jedem Switch lokal fortgeschrieben.
+        Entnommen wird ein Eintrag nur bei eindeutigem Ergebnis (verlassen, gewechselt, fehlgeschlagen);
+        bei RCON-Ausfällen bleiben alle Einträge erhalten und der Durchlauf wird abgebrochen.
+        Rückgabe: Teamstärken nach dem Durchlauf (None, falls abgebrochen).
+        """
+        rname = getattr(client, '_rcon_name', '?')
+        for item in list(queue):
+            if not client.is_available:
+                logger.debug("Queue für RCON '%s' pausiert (Circuit offen).", rname)
+                return None
+            player_id = item['player_id']
+            player_name = item.get('player_name')
+            target_team = item['target_team']
+            channel, scope = self._item_route(client, item)
+
+            logger.debug('Queue: %s -> Zielteam %s', player_name or player_id, target_team)
 
-                try:
-                    client, found_id, pdata = await self._find_player_across_rcons(player_id, player_name)
-                    if not client or not found_id or not isinstance(pdata, dict):
-                        if channel:
-                            await channel.send(lang['player_left_game'].format(
-                                player_name=player_name or player_id
-                            ))
-                        logger.info(f'{player_name or player_id}: nicht (mehr) im Spiel.')
-                        switch_queue.popleft()
-                        await asyncio.sleep(1)
-                        continue
+            try:
+                # Zuerst auf dem eigenen RCON suchen, erst dann auf allen
+                snapshot = await self._roster_for(client)
+                found_id, pdata = snapshot.find(player_id, player_name)
+                rcon_client = client
+                if not found_id:
+                    rcon_client, found_id, pdata = await self._find_player_across_rcons(
+                        player_id, player_name, scope=scope
+                    )
+
+                if not rcon_client or not found_id or not isinstance(pdata, dict):
+                    self.announcer.post(channel, self.lang['player_left_game'].format(
+                        player_name=player_name or player_id
+                    ))
+                    logger.info('%s: nicht (mehr) im Spiel.', player_name or player_id)
+                    await self._dequeue_switch(client, item, 'left')
+                    continue
 
-                    gamestate = await self._get_gamestate_async(client)
-                    res = gamestate.get('result', {}) if isinstance(gamestate, dict) else {}
-                    num_allied_players = int(res.get('num_allied_players', 0))
-                    num_axis_players = int(res.get('num_axis_players', 0))
-                    target_team_players = num_axis_players if target_team == 'axis' else num_allied_players
-
-                    if target_team_players < 50:
-                        response = await self._switch_player_now_async(client, player_id)
-                        if response.get('result') is True and not response.get('failed'):
-                            if channel:
-                                await channel.send(lang['switch_request_success'].format(
-                                    player_name=player_name or player_id
-                                ))
-                            logger.info(f'Switch OK: {player_name or player_id}')
-                        else:
-                            if channel:
-                                await channel.send(lang['switch_request_failure'].format(
-                                    player_name=player_name or player_id
-                                ))
-                            logger.warning(f'Switch FAIL: {player_name or player_id}')
-                        switch_queue.popleft()
-                    else:
-                        logger.debug(f"Zielteam voll für {player_name or player_id}.")
-                except Exception as e:
-                    logger.error(f"Fehler in process_switch_queue: {e}")
-                    switch_queue.popleft()
-            await asyncio.sleep(10)
+                if rcon_client is not client:
+                    # Spieler ist auf einen anderen Server gewechselt – Eintrag folgt ihm
+                    await self._move_switch(client, rcon_client, item)
+                    logger.info("%s: Queue-Eintrag nach RCON '%s' verschoben.",
+                                player_name or player_id, getattr(rcon_client, '_rcon_name', '?'))
+                    continue
+
+                if str(pdata.get('team', '')).lower() == target_team:
+                    # Bereits im Zielteam (z.B. manuell gewechselt)
+                    logger.info('%s: bereits im Zielteam %s.', player_name or player_id, target_team)
+                    await self._dequeue_switch(client, item, 'already_switched')
+                    continue
+
+                switched = await self._try_switch(client, player_id, target_team)
+                if switched is None:
+                    logger.debug("Zielteam voll für %s.", player_name or player_id)
+                    continue
+                if switched:
+                    self.announcer.post(channel, self.lang['switch_request_success'].format(
+                        player_name=player_name or player_id
+                    ))
+                    logger.info('Switch OK: %s', player_name or player_id)
+                else:
+                    self.announcer.post(channel, self.lang['switch_request_failure'].format(
+                        player_name=player_name or player_id
+                    ))
+                    logger.warning('Switch FAIL: %s', player_name or player_id)
+                await self._dequeue_switch(client, item, 'switched' if switched else 'failed')
+            except (CircuitOpenError, aiohttp.ClientError, asyncio.TimeoutError) as e:
+                # RCON vorübergehend nicht erreichbar: Eintrag behalten, Worker wartet ab
+                logger.warning("Queue-Durchlauf auf RCON '%s' abgebrochen (Einträge bleiben erhalten): %s", rname, e)
+                return None
+            except Exception as e:
+                # Kein eindeutiges Ergebnis – Eintrag bleibt in der Queue
+                ERRORS.inc(component='process_switch_queue')
+                logger.error("Fehler in process_switch_queue bei %s: %s", player_name or player_id, e)
+        try:
+            snapshot = await self.team_counts_cache.get(client, self._fetch_team_counts_async)
+        except (CircuitOpenError, aiohttp.ClientError, asyncio.TimeoutError):
+            return None
+        return self._team_counts_now(client, snapshot)
 
 # ---------------------------------------------------------------------
 # Command-Handler
 # ---------------------------------------------------------------------
+def _command_type(cfg: Settings, content: str) -> str:
+    """Label für die Command-Metriken (begrenzte Kardinalität)."""
+    content = content.strip()
+    if content.startswith(f'!{cfg.command_reg}'):
+        return 'reg'
+    if content.startswith(f'!{cfg.command_switch}'):
+        return 'switch'
+    return 'unknown'
+
 async def handle_command(client: MyBot, message: discord.Message):
     content = message.content.strip()
+    cfg = client.settings
+    # Nur die RCONs der Community dieses Channels
+    scope = client.channel_rcons.get(message.channel.id, tuple(client.api_clients))
 
-    if content.startswith(f'!{COMMAND_REG}'):
+    if content.startswith(f'!{cfg.command_reg}'):
         parts = content.split()
         if len(parts) == 2 and is_valid_steam_id(parts[1]):
             steam_id = parts[1]
-            logger.debug(f'Registrierungsanfrage von {message.author} mit Steam-ID {steam_id}')
+            logger.debug('Registrierungsanfrage von %s mit Steam-ID %s', message.author, steam_id)
 
-            api_for_profile = client.api_clients[0] if client.api_clients else None
-            if not api_for_profile:
+            if not scope:
                 await message.channel.send("RCON ist nicht konfiguriert.")
                 return
 
-            player_info = await asyncio.to_thread(api_for_profile.get_player_profile, steam_id)
-            if (isinstance(player_info, dict)
-                and not player_info.get('failed')
-                and 'result' in player_info
-                and player_info['result'].get('names')):
-
-                player_name = player_info['result']['names'][0].get('name', steam_id)
-                if client.db.add_user_with_name(message.author.id, steam_id, player_name):
-                    await message.channel.send(lang['register_success'].format(
+            player_name = await client._resolve_player_name(steam_id, scope=scope)
+            if player_name:
+                if await client.db.add_user_with_name_async(message.author.id, steam_id, player_name):
+                    await message.channel.send(client.lang['register_success'].format(
                         player_name=player_name,
                         steam_id=steam_id,
                         user_mention=message.author.mention
                     ))
-                    logger.info(f'Registriert: {message.author} als {player_name} ({steam_id}).')
+                    logger.info('Registriert: %s als %s (%s).', message.author, player_name, steam_id)
                 else:
-                    await message.channel.send(lang['register_failure'].format(steam_id=steam_id))
-                    logger.warning(f'Registrierung bereits vorhanden/aktualisiert: {message.author} ({steam_id}).')
+                    await message.channel.send(client.lang['register_failure'].format(steam_id=steam_id))
+                    logger.warning('Registrierung bereits vorhanden/aktualisiert: %s (%s).', message.author, steam_id)
             else:
-                await message.channel.send(lang['fetch_failure'].format(steam_id=steam_id))
-                logger.warning(f'Profil für {steam_id} nicht abrufbar.')
+                await message.channel.send(client.lang['fetch_failure'].format(steam_id=steam_id))
+                logger.warning('Profil für %s nicht abrufbar.', steam_id)
         else:
-            await message.channel.send(lang['invalid_steam_id'])
-            logger.warning(f'Ungültige Steam-ID von {message.author}: {message.content}')
+            await message.channel.send(client.lang['invalid_steam_id'])
+            logger.warning('Ungültige Steam-ID von %s: %s', message.author, message.content)
 
-    elif content.startswith(f'!{COMMAND_SWITCH}'):
+    elif content.startswith(f'!{cfg.command_switch}'):
         discord_id = str(message.author.id)
-        steam_id, player_name = client.db.get_steam_id_and_name(discord_id)
+        steam_id, player_name = await client.db.get_steam_id_and_name_async(discord_id)
 
         if steam_id is None:
-            await message.channel.send(lang['not_registered'].format(COMMAND_REG=COMMAND_REG))
-            logger.info(f'Nicht registriert: {message.author}.')
+            await message.channel.send(client.lang['not_registered'].format(COMMAND_REG=cfg.command_reg))
+            logger.info('Nicht registriert: %s.', message.author)
             return
 
-        logger.debug(f'Switch-Anfrage: {message.author} für {player_name} ({steam_id})')
+        logger.debug('Switch-Anfrage: %s für %s (%s)', message.author, player_name, steam_id)
 
-        rcon_client, found_id, pdata = await client._find_player_across_rcons(steam_id, player_name)
+        rcon_client, found_id, pdata = await client._find_player_across_rcons(steam_id, player_name, scope=scope)
         if not rcon_client or not found_id or not isinstance(pdata, dict):
-            await message.channel.send(lang['player_not_in_game'])
-            logger.info(f'{player_name} ist nicht im Spiel.')
+            await message.channel.send(client.lang['player_not_in_game'])
+            logger.info('%s ist nicht im Spiel.', player_name)
             return
 
         player_team = str(pdata.get('team', '')).lower()
         if not player_team:
-            await message.channel.send(lang['player_not_in_game'])
-            logger.info(f'{player_name}: kein Team in Daten.')
+            await message.channel.send(client.lang['player_not_in_game'])
+            logger.info('%s: kein Team in Daten.', player_name)
             return
 
         target_team = 'axis' if player_team == 'allies' else 'allies'
 
-        gamestate = await client._get_gamestate_async(rcon_client)
-        res = gamestate.get('result', {}) if isinstance(gamestate, dict) else {}
-        num_allied_players = int(res.get('num_allied_players', 0))
-        num_axis_players = int(res.get('num_axis_players', 0))
-        target_team_players = num_axis_players if target_team == 'axis' else num_allied_players
-
-        if target_team_players < 50:
-            response = await client._switch_player_now_async(rcon_client, steam_id)
-            if response.get('result') is True and not response.get('failed'):
-                await message.channel.send(lang['switch_request_success'].format(player_name=player_name or steam_id))
-                logger.info(f'Switch OK: {player_name or steam_id}')
-            else:
-                await message.channel.send(lang['switch_request_failure'].format(player_name=player_name or steam_id))
-                logger.warning(f'Switch FAIL: {player_name or steam_id}')
+        switched = await client._try_switch(rcon_client, steam_id, target_team)
+        if switched is True:
+            await message.channel.send(client.lang['switch_request_success'].format(player_name=player_name or steam_id))
+            logger.info('Switch OK: %s', player_name or steam_id)
+        elif switched is False:
+            await message.channel.send(client.lang['switch_request_failure'].format(player_name=player_name or steam_id))
+            logger.warning('Switch FAIL: %s', player_name or steam_id)
         else:
-            MAX_QUEUE_SIZE = 10
-            if len(switch_queue) >= MAX_QUEUE_SIZE:
-                await message.channel.send(lang['queue_full'])
-                logger.info('Warteschlange voll.')
+            rname = getattr(rcon_client, '_rcon_name', '?')
+            # Wer schon wartet, soll "bereits in Queue" hören, auch wenn die Queue voll ist
+            if client._is_queued(steam_id, discord_id):
+                queued = False
             else:
-                switch_queue.append({
+                queued = await client._enqueue_switch(rcon_client, {
                     'player_id': steam_id,
                     'player_name': player_name,
                     'target_team': target_team,
                     'discord_id': discord_id,
+                    'rcon_name': rname,
+                    'enqueued_at': time.time(),
+                    'channel_id': message.channel.id,
                 })
-                await message.channel.send(lang['added_to_queue'].format(
+            if queued is None:
+                await message.channel.send(client.lang['queue_full'])
+                logger.info("Warteschlange voll (RCON '%s').", rname)
+            elif not queued:
+                await message.channel.send(client.lang['already_in_queue'].format(player_name=player_name or steam_id))
+                logger.info('Bereits in Queue: %s', player_name or steam_id)
+            else:
+                await message.channel.send(client.lang['added_to_queue'].format(
                     player_name=player_name or steam_id,
                     target_team=target_team.capitalize()
                 ))
-                logger.info(f'In Queue: {player_name or steam_id} -> {target_team}')
+                logger.info('In Queue: %s -> %s', player_name or steam_id, target_team)
 
     else:
-        await message.channel.send(lang['unknown_command'].format(
-            COMMAND_REG=COMMAND_REG,
-            COMMAND_SWITCH=COMMAND_SWITCH
+        await message.channel.send(client.lang['unknown_command'].format(
+            COMMAND_REG=cfg.command_reg,
+            COMMAND_SWITCH=cfg.command_switch
         ))
-        logger.warning(f'Unbekannter Befehl: {message.author}: {message.content}')
+        logger.warning('Unbekannter Befehl: %s: %s', message.author, message.content)
 
 # ---------------------------------------------------------------------
 # Start
 # ---------------------------------------------------------------------
-bot = MyBot(intents=intents)
-bot.run(TOKEN)
+def main():
+    settings = get_settings()
+    log_listener = setup_logging(settings)
+    try:
+        bot = MyBot(intents=build_intents(), settings=settings)
+        bot.run(settings.token)
+    finally:
+        # Restliche Log-Einträge schreiben
+        log_listener.stop()
+
+if __name__ == '__main__':
+    main()
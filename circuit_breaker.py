@@ -0,0 +1,40 @@
+import time
+from typing import Optional
+
+
+class CircuitOpenError(Exception):
+    """Wird geworfen, wenn ein RCON wegen wiederholter Fehler vorübergehend übersprungen wird."""
+
+
+class CircuitBreaker:
+    """
+    Einfacher Circuit Breaker pro RCON.
+    Nach `failure_threshold` Fehlern in Folge wird der Kreis geöffnet; Requests werden dann
+    sofort abgelehnt, bis ein Probe-Request (nach `reset_timeout` Sekunden) wieder erfolgreich ist.
+    """
+
+    def __init__(self, failure_threshold: int = 3, reset_timeout: float = 30.0):
+        self.failure_threshold = max(1, int(failure_threshold))
+        self.reset_timeout = reset_timeout
+        self.consecutive_failures = 0
+        self.opened_at: Optional[float] = None
+
+    @property
+    def is_open(self) -> bool:
+        return self.opened_at is not None
+
+    def allow_request(self) -> bool:
+        return self.opened_at is None
+
+    def probe_due(self) -> bool:
+        return self.opened_at is not None and time.monotonic() - self.opened_at >= self.reset_timeout
+
+    def record_success(self):
+        self.consecutive_failures = 0
+        self.opened_at = None
+
+    def record_failure(self):
+        self.consecutive_failures += 1
+        if self.consecutive_failures >= self.failure_threshold:
+            # (Erneut) öffnen – der Timer für den nächsten Probe startet neu
+            self.opened_at = time.monotonic()
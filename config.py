@@ -0,0 +1,117 @@
+import json
+import os
+from functools import lru_cache
+
+from dotenv import load_dotenv
+
+
+class Settings:
+    """
+    Konfiguration aus der Umgebung bzw. .env.
+    Wird erst beim ersten Zugriff über get_settings() geladen, nicht beim Import.
+    """
+
+    def __init__(self):
+        # Discord / App-Konfiguration
+        self.token = os.getenv('DISCORD_BOT_TOKEN', '')
+        # Einzelner Channel (oder kommagetrennte Liste), der alle RCONs bedient
+        self.allowed_channel_id = os.getenv('ALLOWED_CHANNEL_ID', '')
+        # Mehrere Communities: JSON-Objekt {"<channel_id>": ["RCON-Name", ...]} bzw. "*" für alle RCONs;
+        # hat Vorrang vor ALLOWED_CHANNEL_ID
+        self.channel_rcons = os.getenv('CHANNEL_RCONS', '').strip()
+        self.db_file = os.getenv('DB_FILE', 'bot.db')
+        # Anzahl gecachter discord_id -> (steam_id, name)-Einträge
+        self.db_cache_size = int(os.getenv('DB_CACHE_SIZE', '1024'))
+        # Sekunden, nach denen gecachte Registrierungen neu gelesen werden (Bulk-Import aus anderem Prozess)
+        self.db_cache_ttl = float(os.getenv('DB_CACHE_TTL', '300'))
+        self.language = os.getenv('LANGUAGE', 'en')
+        self.command_switch = os.getenv('COMMAND_SWITCH', 'switch')
+        self.command_reg = os.getenv('COMMAND_REG', 'reg')
+
+        # RCON-Konfiguration
+        # Gemeinsamer Token für alle RCONs
+        self.api_token = os.getenv('API_TOKEN', '').strip()
+
+        # Variante A (empfohlen bei gleichem Token): Kommagetrennte Base-URLs oder JSON-Array von Strings
+        self.api_base_urls = os.getenv('API_BASE_URLS', '').strip()
+
+        # Variante B (Legacy/Fallback): Einzel-Base-URL
+        self.api_base_url = os.getenv('API_BASE_URL', '').strip()
+
+        # Variante C (Legacy/Optional): JSON-Array aus Objekten [{name, base_url, api_token}]
+        # – wird nur verwendet, wenn gesetzt; sonst ignoriert
+        self.rcons = os.getenv('RCONS', '').strip()
+
+        # Lebensdauer der Spielerlisten-Snapshots pro RCON (Sekunden)
+        self.roster_cache_ttl = float(os.getenv('ROSTER_CACHE_TTL', '5'))
+
+        # Optional: Roster/Teamstärken live aus dem CRCON-Log-Stream (/ws/logs) fortschreiben;
+        # volle Spielerlisten werden dann nur noch alle ROSTER_RECONCILE_INTERVAL Sekunden geladen
+        self.log_stream_enabled = os.getenv('LOG_STREAM_ENABLED', 'false').strip().lower() in ('1', 'true', 'yes')
+        self.roster_reconcile_interval = float(os.getenv('ROSTER_RECONCILE_INTERVAL', '60'))
+
+        # Wie lange aufgelöste Profilnamen (Steam64 -> Name) gecacht werden (Sekunden)
+        self.profile_cache_ttl = float(os.getenv('PROFILE_CACHE_TTL', '3600'))
+
+        # Spielersuche: 'ids' ortet den Spieler zuerst über get_player_ids (kleiner Payload)
+        # und lädt die volle Spielerliste nur vom gefundenen Server; 'detailed' lädt sie überall
+        self.locate_mode = os.getenv('LOCATE_MODE', 'ids').strip().lower()
+
+        # Timeouts pro RCON (Sekunden); in RCONS pro Eintrag überschreibbar (connect_timeout/read_timeout)
+        self.rcon_connect_timeout = float(os.getenv('RCON_CONNECT_TIMEOUT', '3'))
+        self.rcon_read_timeout = float(os.getenv('RCON_READ_TIMEOUT', '10'))
+
+        # Circuit Breaker: nach X Fehlern in Folge wird ein RCON für Y Sekunden übersprungen
+        self.rcon_failure_threshold = int(os.getenv('RCON_FAILURE_THRESHOLD', '3'))
+        self.rcon_reset_timeout = float(os.getenv('RCON_RESET_TIMEOUT', '30'))
+
+        # Queue-Meldungen pro Channel so viele Sekunden sammeln und gebündelt senden (0 = sofort)
+        self.announce_window = float(os.getenv('ANNOUNCE_WINDOW', '2'))
+
+        # Maximale Spielerzahl pro Team; in RCONS pro Eintrag überschreibbar (team_capacity)
+        self.team_capacity = int(os.getenv('TEAM_CAPACITY', '50'))
+        # Wie lange Teamstärken (get_gamestate) pro RCON wiederverwendet werden (Sekunden);
+        # nach einem Switch werden sie lokal fortgeschrieben
+        self.gamestate_cache_ttl = float(os.getenv('GAMESTATE_CACHE_TTL', '2'))
+
+        # Queue-Worker: Grundintervall, schnelles Intervall (nur noch ein Platz fehlt) und
+        # Obergrenze für den Backoff, solange sich die Teamstärken nicht bewegen (Sekunden)
+        self.queue_poll_interval = float(os.getenv('QUEUE_POLL_INTERVAL', '10'))
+        self.queue_poll_fast = float(os.getenv('QUEUE_POLL_FAST', '2'))
+        self.queue_poll_max = float(os.getenv('QUEUE_POLL_MAX', '120'))
+
+        # Maximale Länge der Switch-Warteschlange pro RCON
+        self.max_queue_size = int(os.getenv('MAX_QUEUE_SIZE', '10'))
+
+        # Rate Limits (Token Buckets): Rate in Tokens/Sekunde, Burst = Vorrat; Rate 0 = aus
+        # pro Discord-User und global werden Nachrichten vor jeder DB/HTTP-Arbeit verworfen,
+        # pro RCON werden ausgehende Requests gedrosselt
+        self.rate_limit_user_rate = float(os.getenv('RATE_LIMIT_USER_RATE', '0.2'))
+        self.rate_limit_user_burst = float(os.getenv('RATE_LIMIT_USER_BURST', '3'))
+        self.rate_limit_global_rate = float(os.getenv('RATE_LIMIT_GLOBAL_RATE', '10'))
+        self.rate_limit_global_burst = float(os.getenv('RATE_LIMIT_GLOBAL_BURST', '50'))
+        self.rate_limit_rcon_rate = float(os.getenv('RATE_LIMIT_RCON_RATE', '20'))
+        self.rate_limit_rcon_burst = float(os.getenv('RATE_LIMIT_RCON_BURST', '40'))
+
+        # Logging: Level, Format ('text' oder 'json'), Verzeichnis und Anzahl gzip-Backups
+        self.log_level = os.getenv('LOG_LEVEL', 'INFO').strip().upper()
+        self.log_format = os.getenv('LOG_FORMAT', 'text').strip().lower()
+        self.log_dir = os.getenv('LOG_DIR', 'logs')
+        self.log_backup_count = int(os.getenv('LOG_BACKUP_COUNT', '7'))
+
+        # Optionaler Metrics-Endpunkt (Prometheus-Format); leer = deaktiviert
+        self.metrics_host = os.getenv('METRICS_HOST', '127.0.0.1')
+        self.metrics_port = os.getenv('METRICS_PORT', '').strip()
+
+
+@lru_cache(maxsize=1)
+def get_settings() -> Settings:
+    load_dotenv()
+    return Settings()
+
+
+@lru_cache(maxsize=None)
+def load_translations(language: str, path: str = 'translations.json') -> dict:
+    with open(path, 'r', encoding='utf-8') as file:
+        all_langs = json.load(file)
+    return all_langs.get(language, all_langs['en'])
@@ -1,40 +1,210 @@
+import asyncio
 import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+
+from metrics import DB_QUERY_SECONDS
+from utils import TTLCache
 
 
 class Database:
-    def __init__(self, db_file: str):
-        # check_same_thread=False, falls du irgendwann Threads nutzt
+    def __init__(self, db_file: str, cache_size: int = 1024, cache_ttl: float = 300.0):
+        # Die Verbindung wird nur vom DB-Executor-Thread (bzw. beim Start) benutzt
         self.connection = sqlite3.connect(db_file, check_same_thread=False)
+        # WAL: Leser blockieren Schreiber nicht, Commits ohne fsync pro Transaktion
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute('PRAGMA synchronous=NORMAL')
         self.create_tables()
 
+        # Ein einzelner Thread serialisiert alle Zugriffe auf die Verbindung
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='db')
+
+        # LRU-Cache discord_id -> (steam_id, player_name), nur für Registrierte. Die Ablaufzeit
+        # begrenzt, wie lange Änderungen aus anderen Prozessen (import_users.py) unsichtbar bleiben
+        self._user_cache = TTLCache(cache_ttl, max_size=cache_size)
+        self._cache_lock = threading.Lock()
+
     def create_tables(self):
         self.connection.execute('''CREATE TABLE IF NOT EXISTS users
                                    (discord_id TEXT PRIMARY KEY,
                                     steam_id   TEXT,
                                     player_name TEXT)''')
+        # Persistente Switch-Warteschlange: ein Eintrag pro Spieler bzw. Discord-User
+        self.connection.execute('''CREATE TABLE IF NOT EXISTS switch_queue
+                                   (player_id   TEXT PRIMARY KEY,
+                                    discord_id  TEXT NOT NULL UNIQUE,
+                                    player_name TEXT,
+                                    target_team TEXT NOT NULL,
+                                    rcon_name   TEXT,
+                                    enqueued_at REAL NOT NULL,
+                                    channel_id  TEXT)''')
+        # Ältere Datenbanken: Discord-Channel des Eintrags nachrüsten (Multi-Channel-Routing)
+        columns = {row[1] for row in self.connection.execute('PRAGMA table_info(switch_queue)')}
+        if 'channel_id' not in columns:
+            self.connection.execute('ALTER TABLE switch_queue ADD COLUMN channel_id TEXT')
+        # Zuletzt gesehener RCON pro Spieler (Affinität für die Spielersuche)
+        self.connection.execute('''CREATE TABLE IF NOT EXISTS player_locations
+                                   (steam_id  TEXT PRIMARY KEY,
+                                    rcon_name TEXT NOT NULL,
+                                    last_seen REAL NOT NULL)''')
+        self.connection.execute('''CREATE INDEX IF NOT EXISTS idx_switch_queue_rcon
+                                   ON switch_queue (rcon_name, enqueued_at)''')
         self.connection.commit()
 
+    def close(self):
+        self._executor.shutdown(wait=True)
+        self.connection.close()
+
+    async def run(self, fn: Callable, *args):
+        """Führt eine (synchrone) DB-Methode im DB-Executor aus, nicht auf dem Event-Loop."""
+        loop = asyncio.get_running_loop()
+        with DB_QUERY_SECONDS.time(operation=fn.__name__):
+            return await loop.run_in_executor(self._executor, fn, *args)
+
+    # ---------------------- User-Cache ----------------------
+    def _cache_get(self, discord_id: str) -> Optional[Tuple[Optional[str], Optional[str]]]:
+        with self._cache_lock:
+            return self._user_cache.get(discord_id)
+
+    def _cache_put(self, discord_id: str, value: Tuple[Optional[str], Optional[str]]):
+        with self._cache_lock:
+            self._user_cache.put(discord_id, value)
+
+    # ---------------------- Users ----------------------
     def add_user_with_name(self, discord_id: str, steam_id: str, player_name: str) -> bool:
-        cursor = self.connection.cursor()
-        cursor.execute('SELECT 1 FROM users WHERE discord_id = ?', (discord_id,))
-        if cursor.fetchone() is None:
-            with self.connection:
-                self.connection.execute(
-                    'INSERT INTO users (discord_id, steam_id, player_name) VALUES (?, ?, ?)',
-                    (discord_id, steam_id, player_name)
-                )
-            return True
-        else:
-            # optional: Namen aktualisieren, falls er sich geändert hat
-            with self.connection:
+        """Legt den User an bzw. aktualisiert ihn. True, falls er neu war."""
+        discord_id = str(discord_id)
+        with self.connection:
+            # Neue User (der Normalfall) mit einem einzigen Statement; UPDATE nur für bestehende
+            cursor = self.connection.execute(
+                'INSERT OR IGNORE INTO users (discord_id, steam_id, player_name) VALUES (?, ?, ?)',
+                (discord_id, steam_id, player_name)
+            )
+            is_new = cursor.rowcount == 1
+            if not is_new:
                 self.connection.execute(
                     'UPDATE users SET steam_id = ?, player_name = ? WHERE discord_id = ?',
                     (steam_id, player_name, discord_id)
                 )
-            return False  # existierte bereits
+        self._cache_put(discord_id, (steam_id, player_name))
+        return is_new
+
+    def add_users_bulk(self, rows: List[Tuple[str, str, str]]) -> int:
+        """Legt viele User (discord_id, steam_id, player_name) in einer Transaktion an bzw. aktualisiert sie."""
+        rows = [(str(d), s, n) for d, s, n in rows]
+        with self.connection:
+            self.connection.executemany(
+                'INSERT INTO users (discord_id, steam_id, player_name) VALUES (?, ?, ?) '
+                'ON CONFLICT(discord_id) DO UPDATE SET '
+                'steam_id = excluded.steam_id, player_name = excluded.player_name',
+                rows
+            )
+        for discord_id, steam_id, player_name in rows:
+            self._cache_put(discord_id, (steam_id, player_name))
+        return len(rows)
 
     def get_steam_id_and_name(self, discord_id: str):
+        discord_id = str(discord_id)
+        cached = self._cache_get(discord_id)
+        if cached is not None:
+            return cached
         cursor = self.connection.cursor()
         cursor.execute('SELECT steam_id, player_name FROM users WHERE discord_id = ?', (discord_id,))
         result = cursor.fetchone()
-        return (result[0], result[1]) if result else (None, None)
+        if not result:
+            # Nicht-Registrierte nicht cachen: Registrierungen aus anderen Prozessen (Bulk-Import)
+            # sollen sofort sichtbar sein
+            return None, None
+        value = (result[0], result[1])
+        self._cache_put(discord_id, value)
+        return value
+
+    async def add_user_with_name_async(self, discord_id: str, steam_id: str, player_name: str) -> bool:
+        return await self.run(self.add_user_with_name, discord_id, steam_id, player_name)
+
+    async def add_users_bulk_async(self, rows: List[Tuple[str, str, str]]) -> int:
+        return await self.run(self.add_users_bulk, rows)
+
+    async def get_steam_id_and_name_async(self, discord_id: str):
+        # Cache-Treffer direkt auf dem Loop beantworten, ohne Thread-Wechsel
+        cached = self._cache_get(str(discord_id))
+        if cached is not None:
+            return cached
+        return await self.run(self.get_steam_id_and_name, discord_id)
+
+    # ---------------------- Spieler-Affinität ----------------------
+    def set_player_location(self, steam_id: str, rcon_name: str, last_seen: float):
+        with self.connection:
+            self.connection.execute(
+                'INSERT INTO player_locations (steam_id, rcon_name, last_seen) VALUES (?, ?, ?) '
+                'ON CONFLICT(steam_id) DO UPDATE SET '
+                'rcon_name = excluded.rcon_name, last_seen = excluded.last_seen',
+                (str(steam_id), rcon_name, last_seen)
+            )
+
+    def load_player_locations(self) -> Dict[str, str]:
+        cursor = self.connection.execute('SELECT steam_id, rcon_name FROM player_locations')
+        return {row[0]: row[1] for row in cursor.fetchall()}
+
+    async def set_player_location_async(self, steam_id: str, rcon_name: str, last_seen: float):
+        await self.run(self.set_player_location, steam_id, rcon_name, last_seen)
+
+    async def load_player_locations_async(self) -> Dict[str, str]:
+        return await self.run(self.load_player_locations)
+
+    # ---------------------- Switch-Warteschlange ----------------------
+    def enqueue_switch(self, player_id: str, discord_id: str, player_name: str,
+                       target_team: str, rcon_name: str, enqueued_at: float,
+                       channel_id: Optional[int] = None) -> bool:
+        """Legt einen Queue-Eintrag an. False, falls Spieler/User bereits in der Queue steht."""
+        with self.connection:
+            cursor = self.connection.execute(
+                'INSERT OR IGNORE INTO switch_queue '
+                '(player_id, discord_id, player_name, target_team, rcon_name, enqueued_at, channel_id) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (str(player_id), str(discord_id), player_name, target_team, rcon_name, enqueued_at,
+                 str(channel_id) if channel_id else None)
+            )
+        return cursor.rowcount == 1
+
+    def dequeue_switch(self, player_id: str):
+        with self.connection:
+            self.connection.execute('DELETE FROM switch_queue WHERE player_id = ?', (str(player_id),))
+
+    def update_switch_rcon(self, player_id: str, rcon_name: str):
+        with self.connection:
+            self.connection.execute(
+                'UPDATE switch_queue SET rcon_name = ? WHERE player_id = ?',
+                (rcon_name, str(player_id))
+            )
+
+    def load_switch_queue(self) -> List[dict]:
+        cursor = self.connection.execute(
+            'SELECT player_id, discord_id, player_name, target_team, rcon_name, enqueued_at, channel_id '
+            'FROM switch_queue ORDER BY enqueued_at'
+        )
+        return [
+            {
+                'player_id': row[0],
+                'discord_id': row[1],
+                'player_name': row[2],
+                'target_team': row[3],
+                'rcon_name': row[4],
+                'enqueued_at': row[5],
+                'channel_id': int(row[6]) if row[6] else None,
+            }
+            for row in cursor.fetchall()
+        ]
+
+    async def enqueue_switch_async(self, *args) -> bool:
+        return await self.run(self.enqueue_switch, *args)
+
+    async def dequeue_switch_async(self, player_id: str):
+        await self.run(self.dequeue_switch, player_id)
+
+    async def update_switch_rcon_async(self, player_id: str, rcon_name: str):
+        await self.run(self.update_switch_rcon, player_id, rcon_name)
+
+    async def load_switch_queue_async(self) -> List[dict]:
+        return await self.run(self.load_switch_queue)
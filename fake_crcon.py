@@ -0,0 +1,211 @@
+"""
+Lokaler Stand-in für die CRCON-HTTP-API (nur für Benchmarks/Lasttests).
+
+Beispiel:
+    python fake_crcon.py --port 8010 --players 100 --latency-ms 20
+"""
+import argparse
+import asyncio
+import json
+import random
+from collections import Counter
+from typing import Dict, List, Optional
+
+from aiohttp import web
+
+
+class FakeCRCON:
+    def __init__(self, name: str = 'fake', server_index: int = 0, players: int = 100,
+                 latency: float = 0.0, jitter: float = 0.0, failure_rate: float = 0.0,
+                 payload_bytes: int = 256, team_capacity: int = 50, seed: Optional[int] = None):
+        self.name = name
+        self.server_index = server_index
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.payload_bytes = payload_bytes
+        self.team_capacity = team_capacity
+        self.random = random.Random(seed)
+        self.request_counts: Counter = Counter()
+        self.bytes_sent: Counter = Counter()
+        self.players: Dict[str, dict] = {}
+        # Offene /ws/logs-Verbindungen und fortlaufende Log-ID
+        self._log_subscribers: List[asyncio.Queue] = []
+        self._log_id = 0
+        for i in range(players):
+            self.add_player(i)
+        self._runner: Optional[web.AppRunner] = None
+        self.base_url = ''
+
+    # ---------------------- Spieler-Verwaltung ----------------------
+    def steam_id(self, index: int) -> str:
+        return f'7656119{self.server_index:03d}{index:07d}'
+
+    def add_player(self, index: int, team: Optional[str] = None) -> str:
+        player_id = self.steam_id(index)
+        if team is None:
+            team = 'allies' if index % 2 == 0 else 'axis'
+        self.players[player_id] = {
+            'player_id': player_id,
+            'steam_id_64': player_id,
+            'name': f'{self.name}-player-{index}',
+            'team': team,
+            'unit_name': 'able',
+            'kills': self.random.randint(0, 40),
+            'deaths': self.random.randint(0, 40),
+            'loadout': 'rifleman',
+            # Füllt den Payload auf eine realistische Größe auf (Stats/Profile)
+            'profile': {'padding': 'x' * self.payload_bytes},
+        }
+        self._emit_log('CONNECTED', player_id)
+        return player_id
+
+    def remove_player(self, player_id: str):
+        if player_id in self.players:
+            self._emit_log('DISCONNECTED', player_id)
+        self.players.pop(player_id, None)
+
+    def team_count(self, team: str) -> int:
+        return sum(1 for p in self.players.values() if p['team'] == team)
+
+    # ---------------------- Log-Stream ----------------------
+    def _emit_log(self, action: str, player_id: str, sub_content: str = ''):
+        if not self._log_subscribers:
+            return
+        self._log_id += 1
+        pdata = self.players.get(player_id, {})
+        message = {'logs': [{'id': self._log_id, 'log': {
+            'action': action,
+            'player_id_1': player_id,
+            'player_name_1': pdata.get('name', ''),
+            'sub_content': sub_content,
+        }}], 'last_seen_id': self._log_id, 'error': None}
+        for queue in self._log_subscribers:
+            queue.put_nowait(message)
+
+    async def ws_logs(self, request: web.Request) -> web.WebSocketResponse:
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        self.request_counts['ws_logs'] += 1
+        await ws.receive_json()  # {last_seen_id, actions}; der Fake liefert nur neue Einträge
+        queue: asyncio.Queue = asyncio.Queue()
+        self._log_subscribers.append(queue)
+        try:
+            while not ws.closed:
+                message = await queue.get()
+                if message is None:
+                    break
+                await ws.send_json(message)
+            await ws.close()
+        finally:
+            self._log_subscribers.remove(queue)
+        return ws
+
+    # ---------------------- HTTP ----------------------
+    async def _simulate(self, endpoint: str):
+        self.request_counts[endpoint] += 1
+        delay = self.latency + (self.random.uniform(0, self.jitter) if self.jitter else 0.0)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        if self.failure_rate and self.random.random() < self.failure_rate:
+            raise web.HTTPInternalServerError(text='simulated failure')
+
+    def _json(self, endpoint: str, payload: dict) -> web.Response:
+        body = json.dumps(payload)
+        self.bytes_sent[endpoint] += len(body)
+        return web.Response(text=body, content_type='application/json')
+
+    async def get_detailed_players(self, request: web.Request) -> web.Response:
+        await self._simulate('get_detailed_players')
+        return self._json('get_detailed_players', {'result': {'players': self.players}, 'failed': False})
+
+    async def get_gamestate(self, request: web.Request) -> web.Response:
+        await self._simulate('get_gamestate')
+        return self._json('get_gamestate', {'result': {
+            'num_allied_players': self.team_count('allies'),
+            'num_axis_players': self.team_count('axis'),
+        }, 'failed': False})
+
+    async def switch_player_now(self, request: web.Request) -> web.Response:
+        await self._simulate('switch_player_now')
+        data = await request.json()
+        pdata = self.players.get(str(data.get('player_id', '')))
+        if pdata is None:
+            return self._json('switch_player_now', {'result': None, 'failed': True})
+        target = 'axis' if pdata['team'] == 'allies' else 'allies'
+        if self.team_count(target) >= self.team_capacity:
+            return self._json('switch_player_now', {'result': None, 'failed': True})
+        old_team, pdata['team'] = pdata['team'], target
+        self._emit_log('TEAMSWITCH', pdata['player_id'], f'{old_team.capitalize()} > {target.capitalize()}')
+        return self._json('switch_player_now', {'result': True, 'failed': False})
+
+    async def get_player_profile(self, request: web.Request) -> web.Response:
+        await self._simulate('get_player_profile')
+        player_id = request.query.get('player_id', '')
+        pdata = self.players.get(player_id)
+        name = pdata['name'] if pdata else f'offline-{player_id[-4:]}'
+        num_sessions = int(request.query.get('num_sessions', '10'))
+        return self._json('get_player_profile', {'result': {
+            'player_id': player_id,
+            'names': [{'name': name}],
+            'sessions': [{'padding': 'x' * self.payload_bytes} for _ in range(num_sessions)],
+        }, 'failed': False})
+
+    async def get_player_ids(self, request: web.Request) -> web.Response:
+        await self._simulate('get_player_ids')
+        return self._json('get_player_ids', {
+            'result': {p['name']: pid for pid, p in self.players.items()},
+            'failed': False,
+        })
+
+    def make_app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_get('/api/get_detailed_players', self.get_detailed_players)
+        app.router.add_get('/api/get_gamestate', self.get_gamestate)
+        app.router.add_post('/api/switch_player_now', self.switch_player_now)
+        app.router.add_get('/api/get_player_profile', self.get_player_profile)
+        app.router.add_get('/api/get_player_ids', self.get_player_ids)
+        app.router.add_get('/ws/logs', self.ws_logs)
+        return app
+
+    async def start(self, host: str = '127.0.0.1', port: int = 0) -> str:
+        self._runner = web.AppRunner(self.make_app(), access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        bound_port = self._runner.addresses[0][1]
+        self.base_url = f'http://{host}:{bound_port}'
+        return self.base_url
+
+    async def stop(self):
+        for queue in self._log_subscribers:
+            queue.put_nowait(None)
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+
+async def _serve(args):
+    server = FakeCRCON(
+        name=args.name, players=args.players, latency=args.latency_ms / 1000,
+        failure_rate=args.failure_rate, payload_bytes=args.payload_bytes,
+    )
+    url = await server.start(args.host, args.port)
+    print(f'Fake CRCON {args.name} läuft auf {url}')
+    while True:
+        await asyncio.sleep(3600)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Lokaler Fake-CRCON-Server')
+    parser.add_argument('--name', default='fake')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8010)
+    parser.add_argument('--players', type=int, default=100)
+    parser.add_argument('--latency-ms', type=float, default=0.0)
+    parser.add_argument('--failure-rate', type=float, default=0.0)
+    parser.add_argument('--payload-bytes', type=int, default=256)
+    try:
+        asyncio.run(_serve(parser.parse_args()))
+    except KeyboardInterrupt:
+        pass
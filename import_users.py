@@ -0,0 +1,92 @@
+"""
+Bulk-Import von Registrierungen (z.B. bei Clan-Migrationen).
+
+Liest eine CSV- oder JSON-Datei mit discord_id und steam_id, löst die Spielernamen mit
+begrenzter Parallelität über alle konfigurierten RCONs auf und schreibt alle Einträge
+in einer einzigen Transaktion.
+
+CSV:  discord_id,steam_id   (Kopfzeile optional)
+JSON: [{"discord_id": "...", "steam_id": "..."}, ...] oder [["discord_id", "steam_id"], ...]
+
+Beispiel:
+    python import_users.py users.csv --concurrency 8
+"""
+import argparse
+import asyncio
+import csv
+import json
+import logging
+from typing import List, Tuple
+
+from bot import MyBot, build_intents, logger, setup_logging
+from utils import is_valid_steam_id
+
+
+def read_registrations(path: str) -> List[Tuple[str, str]]:
+    if path.lower().endswith('.json'):
+        with open(path, 'r', encoding='utf-8') as file:
+            data = json.load(file)
+        rows = []
+        for entry in data:
+            if isinstance(entry, dict):
+                rows.append((str(entry.get('discord_id', '')).strip(), str(entry.get('steam_id', '')).strip()))
+            elif isinstance(entry, (list, tuple)) and len(entry) >= 2:
+                rows.append((str(entry[0]).strip(), str(entry[1]).strip()))
+        return rows
+
+    with open(path, 'r', encoding='utf-8', newline='') as file:
+        rows = [(r[0].strip(), r[1].strip()) for r in csv.reader(file) if len(r) >= 2]
+    # Kopfzeile überspringen
+    if rows and not rows[0][0].isdigit():
+        rows = rows[1:]
+    return rows
+
+
+async def import_registrations(path: str, concurrency: int = 8) -> Tuple[int, List[Tuple[str, str]]]:
+    """Rückgabe: (Anzahl importiert, Liste fehlgeschlagener (discord_id, steam_id))."""
+    client = MyBot(intents=build_intents())
+    failed: List[Tuple[str, str]] = []
+    resolved: List[Tuple[str, str, str]] = []
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    async def resolve(index: int, discord_id: str, steam_id: str):
+        if not discord_id.isdigit() or not is_valid_steam_id(steam_id):
+            failed.append((discord_id, steam_id))
+            return
+        async with semaphore:
+            player_name = await client._resolve_player_name(steam_id, offset=index)
+        if player_name:
+            resolved.append((discord_id, steam_id, player_name))
+        else:
+            failed.append((discord_id, steam_id))
+
+    try:
+        rows = read_registrations(path)
+        await asyncio.gather(*(resolve(i, d, s) for i, (d, s) in enumerate(rows)))
+        imported = await client.db.add_users_bulk_async(resolved) if resolved else 0
+    finally:
+        for api in client.api_clients:
+            await api.close()
+        client.db.close()
+    return imported, failed
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Bulk-Import von Discord↔Steam64-Registrierungen')
+    parser.add_argument('path', help='CSV- oder JSON-Datei mit discord_id, steam_id')
+    parser.add_argument('--concurrency', type=int, default=8, help='max. gleichzeitige Profil-Abfragen')
+    args = parser.parse_args()
+
+    log_listener = setup_logging()
+    logger.addHandler(logging.StreamHandler())
+    try:
+        imported, failed = asyncio.run(import_registrations(args.path, args.concurrency))
+        logger.info('Bulk-Import: %s Registrierungen geschrieben, %s fehlgeschlagen.', imported, len(failed))
+        for discord_id, steam_id in failed:
+            logger.warning('Bulk-Import fehlgeschlagen: discord_id=%s steam_id=%s', discord_id, steam_id)
+    finally:
+        log_listener.stop()
+
+
+if __name__ == '__main__':
+    main()
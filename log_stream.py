@@ -0,0 +1,205 @@
+import asyncio
+import json
+import logging
+import re
+import time
+from typing import Callable, Dict, Optional, Tuple
+
+import aiohttp
+
+from api_client import APIClient
+from roster_cache import normalize_name
+
+logger = logging.getLogger('discord_bot')
+
+# Log-Aktionen, die für Roster und Teamstärken relevant sind
+ROSTER_ACTIONS = ('CONNECTED', 'DISCONNECTED', 'TEAMSWITCH')
+
+_TEAM_SWITCH_RE = re.compile(r'(\w+)\s*>\s*(\w+)')
+
+
+def _normalize_team(team) -> Optional[str]:
+    team = str(team or '').strip().lower()
+    return team if team in ('allies', 'axis') else None
+
+
+class LiveRoster:
+    """
+    Spielerliste eines RCONs, die inkrementell aus dem CRCON-Log-Stream fortgeschrieben wird.
+    Bietet dieselbe Such-Schnittstelle wie RosterSnapshot und hält die Teamstärken mit.
+    Periodisch (und nach jedem Reconnect) wird sie mit der vollen Spielerliste abgeglichen.
+    """
+
+    def __init__(self):
+        self.players: Dict[str, dict] = {}
+        self._by_name: Dict[str, str] = {}
+        self._team_counts = {'allies': 0, 'axis': 0}
+        self.synced_at: Optional[float] = None
+
+    @property
+    def is_synced(self) -> bool:
+        return self.synced_at is not None
+
+    def invalidate(self):
+        self.synced_at = None
+
+    # ---------------------- Abgleich ----------------------
+    def reconcile(self, players_map: dict):
+        self.players = {}
+        self._by_name = {}
+        self._team_counts = {'allies': 0, 'axis': 0}
+        for pid, pdata in (players_map or {}).items():
+            if not isinstance(pdata, dict):
+                continue
+            player_id = str(pdata.get('player_id') or pdata.get('steam_id_64') or pid).strip()
+            self._add(player_id, pdata.get('name'), _normalize_team(pdata.get('team')))
+        self.synced_at = time.monotonic()
+
+    # ---------------------- Inkrementelle Updates ----------------------
+    def _add(self, player_id: str, name, team: Optional[str]):
+        self._remove(player_id)
+        self.players[player_id] = {'player_id': player_id, 'name': name or '', 'team': team or ''}
+        if name:
+            self._by_name[normalize_name(name)] = player_id
+        if team:
+            self._team_counts[team] += 1
+
+    def _remove(self, player_id: str) -> Optional[str]:
+        pdata = self.players.pop(player_id, None)
+        if pdata is None:
+            return None
+        if pdata.get('name'):
+            self._by_name.pop(normalize_name(pdata['name']), None)
+        team = _normalize_team(pdata.get('team'))
+        if team:
+            self._team_counts[team] = max(0, self._team_counts[team] - 1)
+        return team
+
+    def apply(self, log: dict) -> Optional[str]:
+        """
+        Wendet einen Log-Eintrag an.
+        Rückgabe: Team, in dem dadurch ein Platz frei geworden ist (oder None).
+        """
+        action = str(log.get('action', '')).upper().replace(' ', '')
+        player_id = str(log.get('player_id_1') or log.get('steam_id_64_1') or '').strip()
+        name = log.get('player_name_1') or log.get('player')
+        if not player_id and name:
+            player_id = self._by_name.get(normalize_name(name), '')
+        if not player_id:
+            return None
+
+        if action.startswith('DISCONNECTED'):
+            return self._remove(player_id)
+
+        if action.startswith('CONNECTED'):
+            if player_id not in self.players:
+                self._add(player_id, name, None)
+            return None
+
+        if action.startswith('TEAMSWITCH'):
+            match = _TEAM_SWITCH_RE.search(str(log.get('sub_content') or log.get('message') or ''))
+            new_team = _normalize_team(match.group(2)) if match else None
+            old = self.players.get(player_id, {})
+            old_team = self._remove(player_id)
+            self._add(player_id, name or old.get('name'), new_team)
+            return old_team if old_team != new_team else None
+
+        return None
+
+    def set_team(self, player_id: str, team: str):
+        """
+        Schreibt einen eigenen, erfolgreichen Switch sofort fort. Der Log-Stream hinkt dem Spiel
+        hinterher; das spätere TEAMSWITCH-Event ändert dann nichts mehr.
+        """
+        pdata = self.players.get(str(player_id).strip())
+        if pdata is None:
+            return
+        self._remove(pdata['player_id'])
+        self._add(pdata['player_id'], pdata.get('name'), team)
+
+    # ---------------------- Abfragen (wie RosterSnapshot) ----------------------
+    def team_count(self, team: str) -> int:
+        return self._team_counts.get(team, 0)
+
+    def find_by_id(self, player_id: str) -> Tuple[Optional[str], Optional[dict]]:
+        pid = str(player_id).strip()
+        pdata = self.players.get(pid)
+        return (pid, pdata) if pdata is not None else (None, None)
+
+    def find_by_name(self, player_name: Optional[str]) -> Tuple[Optional[str], Optional[dict]]:
+        if not player_name:
+            return None, None
+        pid = self._by_name.get(normalize_name(player_name))
+        if pid is None:
+            return None, None
+        return pid, self.players[pid]
+
+    def find(self, player_id: str, player_name: Optional[str] = None) -> Tuple[Optional[str], Optional[dict]]:
+        found_id, pdata = self.find_by_id(player_id)
+        if found_id:
+            return found_id, pdata
+        return self.find_by_name(player_name)
+
+
+class LogStreamSubscriber:
+    """
+    Abonniert den CRCON-Log-Stream (/ws/logs) eines RCONs und schreibt die LiveRoster fort.
+    Bei Verbindungsverlust wird die Roster als nicht synchron markiert und mit Backoff neu verbunden;
+    nach jedem (Re-)Connect wird `on_connected` aufgerufen (Abgleich mit voller Spielerliste).
+    """
+
+    def __init__(self, client: APIClient, roster: LiveRoster,
+                 on_slot_opened: Callable[[str], None],
+                 on_connected: Callable[[], None],
+                 reconnect_delay: float = 5.0, max_reconnect_delay: float = 60.0):
+        self.client = client
+        self.roster = roster
+        self.on_slot_opened = on_slot_opened
+        self.on_connected = on_connected
+        self.reconnect_delay = reconnect_delay
+        self.max_reconnect_delay = max_reconnect_delay
+        self.connected = False
+        self.last_seen_id = None
+
+    def _handle_message(self, raw: str):
+        data = json.loads(raw)
+        if not isinstance(data, dict):
+            return
+        if data.get('error'):
+            logger.warning("Log-Stream '%s': %s", getattr(self.client, '_rcon_name', '?'), data['error'])
+        for entry in data.get('logs') or []:
+            if not isinstance(entry, dict):
+                continue
+            self.last_seen_id = entry.get('id', self.last_seen_id)
+            log = entry.get('log', entry)
+            if isinstance(log, dict):
+                freed_team = self.roster.apply(log)
+                if freed_team:
+                    self.on_slot_opened(freed_team)
+        self.last_seen_id = data.get('last_seen_id', self.last_seen_id)
+
+    async def run(self):
+        rname = getattr(self.client, '_rcon_name', '?')
+        delay = self.reconnect_delay
+        while True:
+            try:
+                async with self.client.connect_log_stream() as ws:
+                    await ws.send_json({'last_seen_id': self.last_seen_id, 'actions': list(ROSTER_ACTIONS)})
+                    self.connected = True
+                    delay = self.reconnect_delay
+                    logger.info("Log-Stream für RCON '%s' verbunden.", rname)
+                    self.on_connected()
+                    async for msg in ws:
+                        if msg.type == aiohttp.WSMsgType.TEXT:
+                            self._handle_message(msg.data)
+                        elif msg.type in (aiohttp.WSMsgType.CLOSED, aiohttp.WSMsgType.ERROR):
+                            break
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("Log-Stream für RCON '%s' unterbrochen: %s", rname, e)
+            finally:
+                self.connected = False
+                self.roster.invalidate()
+            await asyncio.sleep(delay)
+            delay = min(self.max_reconnect_delay, delay * 2)
@@ -0,0 +1,110 @@
+import gzip
+import json
+import logging
+import os
+import queue
+import shutil
+import sys
+from logging.handlers import QueueHandler, QueueListener, TimedRotatingFileHandler
+from typing import List
+
+# Attribute, die jeder LogRecord hat; alles andere kam über `extra=` und landet im JSON
+_RECORD_ATTRS = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+
+class JsonFormatter(logging.Formatter):
+    """Eine JSON-Zeile pro Log-Eintrag (Felder aus `extra=` werden übernommen)."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {
+            'time': self.formatTime(record),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRS and not key.startswith('_'):
+                payload[key] = value
+        if record.exc_info:
+            payload['exc_info'] = self.formatException(record.exc_info)
+        return json.dumps(payload, ensure_ascii=False, default=str)
+
+
+class _LazyQueueHandler(QueueHandler):
+    """
+    Legt den LogRecord unverändert in die Queue. Der Standard-QueueHandler formatiert die
+    Nachricht schon im aufrufenden Thread (Event-Loop); hier passiert das erst im Listener-Thread.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+class CompressingTimedRotatingFileHandler(TimedRotatingFileHandler):
+    """
+    Rotiert um Mitternacht und komprimiert das rotierte Log sofort mit gzip.
+    Läuft im Listener-Thread, d.h. weder beim Start noch auf dem Event-Loop.
+    """
+
+    def __init__(self, filename: str, backup_count: int = 7):
+        super().__init__(filename, when='midnight', interval=1, backupCount=backup_count,
+                         encoding='utf-8', delay=True)
+        self.suffix = '%Y%m%d'
+        self.namer = lambda name: name + '.gz'
+        self.rotator = self._gzip_rotate
+
+    def _gzip_rotate(self, source: str, dest: str):
+        if os.path.exists(source):
+            _gzip_file(source, dest)
+        # Unkomprimierte Backups älterer Versionen bei der Gelegenheit nachziehen
+        log_dir, base_name = os.path.split(self.baseFilename)
+        for filename in os.listdir(log_dir):
+            if filename.startswith(base_name + '.') and not filename.endswith('.gz'):
+                path = os.path.join(log_dir, filename)
+                _gzip_file(path, path + '.gz')
+
+    def getFilesToDelete(self) -> List[str]:
+        log_dir, base_name = os.path.split(self.baseFilename)
+        archives = sorted(
+            f for f in os.listdir(log_dir) if f.startswith(base_name + '.') and f.endswith('.gz')
+        )
+        if len(archives) <= self.backupCount:
+            return []
+        return [os.path.join(log_dir, f) for f in archives[:len(archives) - self.backupCount]]
+
+
+def _gzip_file(source: str, dest: str):
+    try:
+        with open(source, 'rb') as f_in, gzip.open(dest, 'wb') as f_out:
+            shutil.copyfileobj(f_in, f_out)
+        os.remove(source)
+    except OSError as e:
+        # Wie logging.Handler.handleError nach stderr: ein Log-Eintrag käme über die Queue wieder
+        # bei diesem Handler an, der gerade (z.B. wegen voller Platte) nicht schreiben kann
+        sys.stderr.write(f'Konnte {source} nicht komprimieren: {e}\n')
+
+
+def setup_logging(logger: logging.Logger, log_dir: str = 'logs', level: str = 'INFO',
+                  log_format: str = 'text', backup_count: int = 7) -> QueueListener:
+    """
+    Hängt einen Queue-Handler an `logger`. Formatierung, Datei-I/O, Rotation und Kompression
+    übernimmt ein QueueListener in einem eigenen Thread. Der Listener muss beim Beenden
+    mit stop() geleert werden.
+    """
+    os.makedirs(log_dir, exist_ok=True)
+
+    file_handler = CompressingTimedRotatingFileHandler(
+        os.path.join(log_dir, f'{logger.name}.log'), backup_count=backup_count
+    )
+    if log_format == 'json':
+        file_handler.setFormatter(JsonFormatter())
+    else:
+        file_handler.setFormatter(logging.Formatter('%(asctime)s:%(levelname)s:%(name)s: %(message)s'))
+
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    logger.setLevel(getattr(logging, level.upper(), logging.INFO))
+    logger.addHandler(_LazyQueueHandler(log_queue))
+
+    listener = QueueListener(log_queue, file_handler, respect_handler_level=True)
+    listener.start()
+    return listener
@@ -0,0 +1,179 @@
+import bisect
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from aiohttp import web
+
+# Standard-Buckets (Sekunden) für Latenzen
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Buckets für Wartezeiten in der Switch-Queue
+WAIT_BUCKETS = (1, 5, 10, 30, 60, 120, 300, 600, 1800)
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(names: Iterable[str], values: Iterable[str], extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(f'{extra[0]}="{extra[1]}"')
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    kind = ''
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        return tuple(str(labels.get(n, '')) for n in self.labelnames)
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> List[str]:
+        return [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.kind}'] + self._samples()
+
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0.0) + amount
+
+    def _samples(self) -> List[str]:
+        return [f'{self.name}{_format_labels(self.labelnames, k)} {_format_value(v)}'
+                for k, v in self._values.items()]
+
+
+class Gauge(_Metric):
+    """Gauge, deren Werte beim Scrape über eine Callback-Funktion ermittelt werden."""
+    kind = 'gauge'
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._collect: Optional[Callable[[], Dict[LabelValues, float]]] = None
+
+    def set_function(self, collect: Callable[[], Dict[LabelValues, float]]):
+        self._collect = collect
+
+    def _samples(self) -> List[str]:
+        values = self._collect() if self._collect else {}
+        return [f'{self.name}{_format_labels(self.labelnames, k)} {_format_value(v)}'
+                for k, v in values.items()]
+
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = (),
+                 buckets: Iterable[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # pro Label-Kombination: [Zähler pro Bucket..., +Inf], Summe
+        self._counts: Dict[LabelValues, List[int]] = {}
+        self._sums: Dict[LabelValues, float] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        counts = self._counts.get(key)
+        if counts is None:
+            counts = self._counts[key] = [0] * (len(self.buckets) + 1)
+            self._sums[key] = 0.0
+        counts[bisect.bisect_left(self.buckets, value)] += 1
+        self._sums[key] += value
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def _samples(self) -> List[str]:
+        lines = []
+        for key, counts in self._counts.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += count
+                le = _format_labels(self.labelnames, key, ('le', _format_value(bound)))
+                lines.append(f'{self.name}_bucket{le} {cumulative}')
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f'{self.name}_sum{labels} {_format_value(self._sums[key])}')
+            lines.append(f'{self.name}_count{labels} {cumulative}')
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+RCON_REQUEST_SECONDS = REGISTRY.register(Histogram(
+    'switchbot_rcon_request_seconds', 'Latenz der CRCON-Requests', ('rcon', 'endpoint')))
+RCON_REQUEST_ERRORS = REGISTRY.register(Counter(
+    'switchbot_rcon_request_errors_total', 'Fehlgeschlagene CRCON-Requests', ('rcon', 'endpoint')))
+RCON_REQUESTS_COALESCED = REGISTRY.register(Counter(
+    'switchbot_rcon_requests_coalesced_total', 'CRCON-Requests, die sich einen laufenden Request geteilt haben',
+    ('rcon', 'endpoint')))
+COMMAND_SECONDS = REGISTRY.register(Histogram(
+    'switchbot_command_seconds', 'End-to-End-Latenz von handle_command', ('command',)))
+QUEUE_DEPTH = REGISTRY.register(Gauge(
+    'switchbot_queue_depth', 'Anzahl Einträge in der Switch-Queue', ('rcon',)))
+QUEUE_WAIT_SECONDS = REGISTRY.register(Histogram(
+    'switchbot_queue_wait_seconds', 'Wartezeit in der Switch-Queue bis zur Entnahme', ('rcon', 'outcome'),
+    buckets=WAIT_BUCKETS))
+DB_QUERY_SECONDS = REGISTRY.register(Histogram(
+    'switchbot_db_query_seconds', 'Dauer der Datenbank-Operationen', ('operation',)))
+RATE_LIMITED = REGISTRY.register(Counter(
+    'switchbot_rate_limited_total', 'Durch Rate Limits verworfene Nachrichten bzw. gedrosselte Requests', ('scope',)))
+ANNOUNCEMENTS = REGISTRY.register(Counter(
+    'switchbot_announcements_total', 'Queue-Meldungen (line) und tatsächlich gesendete Discord-Nachrichten (message)',
+    ('kind',)))
+ERRORS = REGISTRY.register(Counter(
+    'switchbot_errors_total', 'Unerwartete Fehler nach Komponente', ('component',)))
+
+
+async def start_metrics_server(host: str, port: int, registry: Registry = REGISTRY) -> web.AppRunner:
+    """Startet einen lokalen HTTP-Endpunkt /metrics im Prometheus-Textformat."""
+    async def handle_metrics(request: web.Request) -> web.Response:
+        return web.Response(text=registry.render(), content_type='text/plain', charset='utf-8')
+
+    app = web.Application()
+    app.router.add_get('/metrics', handle_metrics)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, host, port)
+    await site.start()
+    return runner
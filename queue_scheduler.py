@@ -0,0 +1,49 @@
+from typing import Dict, Iterable, Optional
+
+
+def slots_needed(team_counts: Dict[str, int], target_teams: Iterable[str], capacity: int) -> Optional[int]:
+    """
+    Wie viele Spieler das am wenigsten volle Zielteam noch verlassen müssen, bis ein Platz frei ist.
+    None, wenn kein Zielteam wartet.
+    """
+    needed = [team_counts.get(team, 0) - capacity + 1 for team in target_teams]
+    return max(0, min(needed)) if needed else None
+
+
+class QueueBackoff:
+    """
+    Wartezeit bis zum nächsten Queue-Durchlauf eines RCONs:
+    - ist ein Platz frei (aber noch nicht vergeben), wird schnell nachgefragt (`fast`),
+    - fehlt nur noch ein Platz, ebenfalls `fast`, solange sich die Teamstärken bewegen; sonst
+      verdoppelt sich die Wartezeit, aber höchstens bis `base` (ein frei werdender Platz wird
+      auf vollen Servern schnell wieder belegt),
+    - fehlen mehrere Plätze, gilt bei Bewegung `base`, ohne Bewegung verdoppelt sich die
+      Wartezeit bis `max_delay`.
+    """
+
+    def __init__(self, base: float = 10.0, fast: float = 2.0, max_delay: float = 120.0):
+        self.base = base
+        self.fast = min(fast, base)
+        self.max_delay = max(max_delay, base)
+        self.delay = base
+        self._last_counts: Optional[Dict[str, int]] = None
+
+    def reset(self):
+        self.delay = self.base
+        self._last_counts = None
+
+    def next_delay(self, team_counts: Optional[Dict[str, int]], needed: Optional[int]) -> float:
+        if team_counts is None:
+            return self.base
+        changed = team_counts != self._last_counts
+        self._last_counts = dict(team_counts)
+        one_slot_away = needed is not None and needed <= 1
+        if needed == 0 or (changed and one_slot_away):
+            self.delay = self.fast
+        elif one_slot_away:
+            self.delay = min(self.base, self.delay * 2)
+        elif changed:
+            self.delay = self.base
+        else:
+            self.delay = min(self.max_delay, self.delay * 2)
+        return self.delay
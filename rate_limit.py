@@ -0,0 +1,78 @@
+import asyncio
+import time
+from typing import Dict, Hashable, Optional
+
+
+class TokenBucket:
+    """
+    Klassischer Token Bucket: `rate` Tokens pro Sekunde, höchstens `burst` auf Vorrat.
+    rate <= 0 deaktiviert die Begrenzung.
+    """
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = float(rate)
+        self.burst = max(1.0, float(burst))
+        self.tokens = self.burst
+        self.updated_at = time.monotonic()
+
+    @property
+    def enabled(self) -> bool:
+        return self.rate > 0
+
+    def _refill(self, now: float):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def try_acquire(self, tokens: float = 1.0) -> bool:
+        if not self.enabled:
+            return True
+        self._refill(time.monotonic())
+        if self.tokens >= tokens:
+            self.tokens -= tokens
+            return True
+        return False
+
+    def delay_until_available(self, tokens: float = 1.0) -> float:
+        if not self.enabled:
+            return 0.0
+        self._refill(time.monotonic())
+        return max(0.0, (tokens - self.tokens) / self.rate)
+
+    async def acquire(self, tokens: float = 1.0):
+        """Wartet, bis genug Tokens vorhanden sind (glättet Bursts statt sie abzulehnen)."""
+        while not self.try_acquire(tokens):
+            await asyncio.sleep(self.delay_until_available(tokens))
+
+    def is_idle(self, now: Optional[float] = None) -> bool:
+        """True, wenn der Bucket inzwischen wieder voll wäre (kann verworfen werden)."""
+        now = time.monotonic() if now is None else now
+        return not self.enabled or self.tokens + (now - self.updated_at) * self.rate >= self.burst
+
+
+class KeyedRateLimiter:
+    """Ein Token Bucket pro Key (z.B. Discord-User); volle Buckets werden regelmäßig verworfen."""
+
+    def __init__(self, rate: float, burst: float, max_keys: int = 10000):
+        self.rate = rate
+        self.burst = burst
+        self.max_keys = max_keys
+        self._buckets: Dict[Hashable, TokenBucket] = {}
+
+    @property
+    def enabled(self) -> bool:
+        return self.rate > 0
+
+    def try_acquire(self, key: Hashable, tokens: float = 1.0) -> bool:
+        if not self.enabled:
+            return True
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            if len(self._buckets) >= self.max_keys:
+                self._prune()
+            bucket = self._buckets[key] = TokenBucket(self.rate, self.burst)
+        return bucket.try_acquire(tokens)
+
+    def _prune(self):
+        now = time.monotonic()
+        for key in [k for k, b in self._buckets.items() if b.is_idle(now)]:
+            del self._buckets[key]
@@ -0,0 +1,172 @@
+import asyncio
+import time
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+
+from api_client import APIClient
+
+
+def extract_players_map(players_response: dict) -> dict:
+    if not isinstance(players_response, dict):
+        return {}
+    result = players_response.get('result', {})
+    if not isinstance(result, dict):
+        return {}
+    players = result.get('players', {})
+    return players if isinstance(players, dict) else {}
+
+
+def normalize_name(name) -> str:
+    return str(name or '').strip().lower()
+
+
+class RosterSnapshot:
+    """
+    Momentaufnahme der Spielerliste eines RCONs.
+    Beim Erzeugen wird ein Index Steam64/player_id -> Key und Name -> Key aufgebaut,
+    damit Lookups ohne Scan über alle Spieler auskommen.
+    """
+
+    def __init__(self, players_map: dict, fetched_at: Optional[float] = None):
+        self.players = players_map if isinstance(players_map, dict) else {}
+        self.fetched_at = time.monotonic() if fetched_at is None else fetched_at
+        self._by_id: Dict[str, str] = {}
+        self._by_name: Dict[str, str] = {}
+
+        # Direkte Keys zuerst, damit sie Vorrang vor den Feldern haben
+        for pid in self.players:
+            self._by_id[str(pid).strip()] = pid
+        for pid, pdata in self.players.items():
+            if not isinstance(pdata, dict):
+                continue
+            for k in ('steam_id_64', 'player_id', 'id'):
+                value = str(pdata.get(k, '')).strip()
+                if value:
+                    self._by_id.setdefault(value, pid)
+            name = normalize_name(pdata.get('name'))
+            if name:
+                self._by_name.setdefault(name, pid)
+
+    def age(self) -> float:
+        return time.monotonic() - self.fetched_at
+
+    def find_by_id(self, player_id: str) -> Tuple[Optional[str], Optional[dict]]:
+        pid = self._by_id.get(str(player_id).strip())
+        if pid is None:
+            return None, None
+        return pid, self.players[pid]
+
+    def find_by_name(self, player_name: Optional[str]) -> Tuple[Optional[str], Optional[dict]]:
+        if not player_name:
+            return None, None
+        pid = self._by_name.get(normalize_name(player_name))
+        if pid is None:
+            return None, None
+        return pid, self.players[pid]
+
+    def find(self, player_id: str, player_name: Optional[str] = None) -> Tuple[Optional[str], Optional[dict]]:
+        found_id, pdata = self.find_by_id(player_id)
+        if found_id:
+            return found_id, pdata
+        return self.find_by_name(player_name)
+
+    def set_team(self, player_id: str, team: str):
+        """Schreibt einen bekannten Teamwechsel in den Snapshot (statt ihn neu zu laden)."""
+        _, pdata = self.find_by_id(player_id)
+        if isinstance(pdata, dict):
+            pdata['team'] = team
+
+
+class PlayerIdsSnapshot:
+    """
+    Momentaufnahme von get_player_ids (Name -> ID) eines RCONs.
+    Reicht, um festzustellen, ob ein Spieler auf dem Server ist – ohne Team/Stats.
+    """
+
+    def __init__(self, players_response: dict, fetched_at: Optional[float] = None):
+        self.fetched_at = time.monotonic() if fetched_at is None else fetched_at
+        result = players_response.get('result') if isinstance(players_response, dict) else None
+        if isinstance(result, dict):
+            pairs = result.items()
+        elif isinstance(result, list):
+            pairs = [tuple(p[:2]) for p in result if isinstance(p, (list, tuple)) and len(p) >= 2]
+        else:
+            pairs = []
+        self._ids = {str(pid).strip() for _, pid in pairs}
+        self._names = {normalize_name(name) for name, _ in pairs}
+
+    def age(self) -> float:
+        return time.monotonic() - self.fetched_at
+
+    def contains(self, player_id: str, player_name: Optional[str] = None) -> bool:
+        if str(player_id).strip() in self._ids:
+            return True
+        return bool(player_name) and normalize_name(player_name) in self._names
+
+
+class TeamCounts:
+    """
+    Teamstärken aus get_gamestate eines RCONs.
+    Laufende und seit dem Request abgeschlossene Switches werden nicht hier, sondern außerhalb
+    des Caches gezählt (MyBot._team_counts_now), damit sie ein Ablaufen/Verwerfen des Snapshots überleben.
+    """
+
+    def __init__(self, gamestate_response: dict, fetched_at: Optional[float] = None):
+        self.fetched_at = time.monotonic() if fetched_at is None else fetched_at
+        res = gamestate_response.get('result') if isinstance(gamestate_response, dict) else None
+        res = res if isinstance(res, dict) else {}
+        self.counts: Dict[str, int] = {
+            'allies': int(res.get('num_allied_players', 0) or 0),
+            'axis': int(res.get('num_axis_players', 0) or 0),
+        }
+
+    def age(self) -> float:
+        return time.monotonic() - self.fetched_at
+
+    def count(self, team: str) -> int:
+        return self.counts.get(team, 0)
+
+
+class RosterCache:
+    """
+    Pro RCON eine Snapshot mit TTL (standardmäßig RosterSnapshot aus get_detailed_players).
+    Gleichzeitige Anfragen an denselben RCON warten auf einen gemeinsamen Refresh.
+    """
+
+    def __init__(self, ttl: float, builder: Optional[Callable[[dict], object]] = None):
+        self.ttl = ttl
+        self.builder = builder or (lambda resp: RosterSnapshot(extract_players_map(resp)))
+        self._snapshots: Dict[APIClient, RosterSnapshot] = {}
+        self._locks: Dict[APIClient, asyncio.Lock] = {}
+
+    def _fresh(self, client: APIClient) -> Optional[RosterSnapshot]:
+        snap = self._snapshots.get(client)
+        if snap is not None and snap.age() < self.ttl:
+            return snap
+        return None
+
+    async def get(
+        self, client: APIClient, fetch: Callable[[APIClient], Awaitable[dict]]
+    ) -> RosterSnapshot:
+        snap = self._fresh(client)
+        if snap is not None:
+            return snap
+
+        lock = self._locks.setdefault(client, asyncio.Lock())
+        async with lock:
+            # Evtl. hat ein anderer Aufrufer inzwischen aktualisiert
+            snap = self._fresh(client)
+            if snap is not None:
+                return snap
+            started = time.monotonic()
+            players_resp = await fetch(client)
+            snap = self.builder(players_resp)
+            # Alter ab Request-Beginn: was danach passiert ist, fehlt evtl. im Snapshot
+            snap.fetched_at = started
+            self._snapshots[client] = snap
+            return snap
+
+    def invalidate(self, client: Optional[APIClient] = None):
+        if client is None:
+            self._snapshots.clear()
+        else:
+            self._snapshots.pop(client, None)
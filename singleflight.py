@@ -0,0 +1,33 @@
+import asyncio
+from typing import Awaitable, Callable, Dict, Hashable, TypeVar
+
+T = TypeVar('T')
+
+
+class SingleFlight:
+    """
+    Fasst gleichzeitige, identische Aufrufe zusammen: solange ein Aufruf für einen Key
+    läuft, warten weitere Aufrufer auf dasselbe Ergebnis statt einen neuen Request zu starten.
+    """
+
+    def __init__(self):
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+
+    def in_flight(self, key: Hashable) -> bool:
+        return key in self._inflight
+
+    def _done(self, key: Hashable, task: asyncio.Task):
+        self._inflight.pop(key, None)
+        # Haben alle Aufrufer aufgegeben, holt sonst niemand die Exception ab
+        # ("Task exception was never retrieved"); die Aufrufer bekommen sie über shield
+        if not task.cancelled():
+            task.exception()
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._done(key, t))
+        # shield: bricht ein Aufrufer ab (z.B. Fan-out-Abbruch), laufen die anderen weiter
+        return await asyncio.shield(task)
@@ -1,2 +1,32 @@
+import time
+from collections import OrderedDict
+
+
 def is_valid_steam_id(steam_id):
-    return steam_id.isdigit() and steam_id.startswith('7656') and len(steam_id) == 17
\ No newline at end of file
+    return steam_id.isdigit() and steam_id.startswith('7656') and len(steam_id) == 17
+
+
+class TTLCache:
+    """Kleiner LRU-Cache mit Ablaufzeit pro Eintrag."""
+
+    def __init__(self, ttl: float, max_size: int = 4096):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._data = OrderedDict()
+
+    def get(self, key):
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if time.monotonic() >= expires_at:
+            del self._data[key]
+            return None
+        self._data.move_to_end(key)
+        return value
+
+    def put(self, key, value):
+        self._data[key] = (value, time.monotonic() + self.ttl)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_size:
+            self._data.popitem(last=False)